@@ -0,0 +1,261 @@
+"""Autopilot class for PySnake game.
+
+This class plays the game instead of a player: it chooses the next
+direction of the snake of a SnakeEngine. The shortest path to the apple
+is found by A* with the Manhattan distance and kept between ticks,
+a new search is made only when the apple is moved or the path is
+blocked. A search expands not more than _MAX_EXPANSIONS cells, so a tick
+takes bounded time on any game area; a search stopped by the limit
+leads the snake to the expanded cell closest to the apple. While the
+apple can not be reached the snake follows a Hamiltonian cycle of the
+game area; the failed search is repeated only when the free cells
+around the apple change or after _RETRY_TICKS ticks.
+
+"""
+
+
+import heapq
+
+from collections import deque
+
+from engine import SnakeEngine
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class Autopilot(object):
+    """Chooses directions for the snake of a SnakeEngine.
+    The object of this class is controlled instance of the Game.
+
+    """
+
+    _NAMES = {step: name for name, step in SnakeEngine.DIRECTIONS.items()}
+    _MAX_EXPANSIONS = 1000
+    _RETRY_TICKS = 20
+    _CYCLES = {}
+
+    def __init__(self, engine):
+        """Initialize an instance.
+
+        Argument engine is instance of the SnakeEngine.
+
+        """
+        self._engine = engine
+        self._path = deque()
+        self._target = None
+        self._retry = None
+        self._cycle = Autopilot._hamiltonian_cycle(engine.width, engine.height)
+
+    def next_direction(self):
+        """Returns a key of SnakeEngine.DIRECTIONS for the next tick
+        or None to keep the current direction.
+
+        """
+        engine = self._engine
+        head = self._index(engine.body[0])
+        if engine.apple != self._target:
+            self._plan(head)
+        elif self._path:
+            if (engine.grid[self._path[0]] or
+                    not self._adjacent(head, self._path[0])):
+                self._plan(head)
+        elif self._retry_due():
+            self._plan(head)
+        if self._path:
+            cell = self._path.popleft()
+        else:
+            cell = self._fallback(head)
+            if cell is None:
+                return None
+        width = engine.width
+        step = (cell % width - head % width, cell // width - head // width)
+        return Autopilot._NAMES[step]
+
+    def _index(self, cell):
+        """Returns the index of the cell."""
+
+        return cell[1] * self._engine.width + cell[0]
+
+    def _adjacent(self, cell, other):
+        """Checks that two cells have a common side."""
+
+        width = self._engine.width
+        if abs(cell - other) == width:
+            return True
+        return abs(cell - other) == 1 and cell // width == other // width
+
+    def _neighbours(self, cell):
+        """Yields the cells that have a common side with the cell."""
+
+        width = self._engine.width
+        x = cell % width
+        if x > 0:
+            yield cell - 1
+        if x < width - 1:
+            yield cell + 1
+        if cell >= width:
+            yield cell - width
+        if cell < len(self._engine.grid) - width:
+            yield cell + width
+
+    def _plan(self, head):
+        """Searches the shortest path from the head to the apple,
+        expands not more than _MAX_EXPANSIONS cells. If the limit
+        is reached, the path goes to the expanded cell closest
+        to the apple.
+
+        """
+        engine = self._engine
+        self._path.clear()
+        self._target = engine.apple
+        self._retry = None
+        if engine.apple is None:
+            return
+        goal_x, goal_y = engine.apple
+        goal = self._index(engine.apple)
+        grid = engine.grid
+        width = engine.width
+        parents = {head: None}
+        costs = {head: 0}
+        distance = abs(head % width - goal_x) + abs(head // width - goal_y)
+        queue = [(distance, distance, head)]
+        closest = (distance, head)
+        expansions = 0
+        while queue and expansions < Autopilot._MAX_EXPANSIONS:
+            estimate, distance, cell = heapq.heappop(queue)
+            if cell == goal:
+                while cell != head:
+                    self._path.appendleft(cell)
+                    cell = parents[cell]
+                return
+            cost = costs[cell]
+            if estimate - distance != cost:
+                # The cell was queued again with a shorter path.
+                continue
+            closest = min(closest, (distance, cell))
+            expansions += 1
+            for neighbour in self._neighbours(cell):
+                if grid[neighbour]:
+                    continue
+                if neighbour in costs and costs[neighbour] <= cost + 1:
+                    continue
+                parents[neighbour] = cell
+                costs[neighbour] = cost + 1
+                distance = (abs(neighbour % width - goal_x) +
+                            abs(neighbour // width - goal_y))
+                heapq.heappush(
+                    queue, (cost + 1 + distance, distance, neighbour)
+                )
+        if queue:
+            cell = closest[1]
+            while cell != head:
+                self._path.appendleft(cell)
+                cell = parents[cell]
+        else:
+            self._retry = (
+                engine.ticks + Autopilot._RETRY_TICKS,
+                self._free_around(goal)
+            )
+
+    def _retry_due(self):
+        """Checks that the failed search for the apple is worth
+        repeating: the free cells around the apple have changed
+        or _RETRY_TICKS ticks have passed.
+
+        """
+        if self._retry is None:
+            return True
+        ticks, free = self._retry
+        return (self._engine.ticks >= ticks or
+                self._free_around(self._index(self._target)) != free)
+
+    def _free_around(self, cell):
+        """Returns the free cells that have a common side
+        with the cell.
+
+        """
+        grid = self._engine.grid
+        return tuple(
+            neighbour for neighbour in self._neighbours(cell)
+            if not grid[neighbour]
+        )
+
+    def _fallback(self, head):
+        """Returns the next cell of the Hamiltonian cycle if it is free,
+        otherwise any free neighbour of the head, or None.
+
+        """
+        grid = self._engine.grid
+        if self._cycle is not None and not grid[self._cycle[head]]:
+            return self._cycle[head]
+        for neighbour in self._neighbours(head):
+            if not grid[neighbour]:
+                return neighbour
+        return None
+
+    @staticmethod
+    def _hamiltonian_cycle(width, height):
+        """Returns a tuple where item i is the cell after cell i
+        in a Hamiltonian cycle of the game area, or None if one side
+        is shorter than 2. The cycles are cached by size.
+
+        """
+        key = (width, height)
+        if key not in Autopilot._CYCLES:
+            Autopilot._CYCLES[key] = Autopilot._build_cycle(width, height)
+        return Autopilot._CYCLES[key]
+
+    @staticmethod
+    def _build_cycle(width, height):
+        """Builds the cycle for _hamiltonian_cycle().
+
+        The cycle goes along the first column (or row) and snakes
+        through the others. An area with both sides odd has no
+        Hamiltonian cycle: the cycle snakes through the columns but
+        the last one, and makes detours through the last column
+        to cover all the cells except its top one, which leads
+        to the cycle.
+
+        """
+        if width < 2 or height < 2:
+            return None
+        if width % 2 and height % 2:
+            order = [(0, 0)]
+            for x in range(width - 1):
+                rows = range(1, height) if x % 2 == 0 \
+                    else range(height - 1, 0, -1)
+                for y in rows:
+                    order.append((x, y))
+                    if x == width - 2 and y % 2 == 0:
+                        order.extend(((x + 1, y), (x + 1, y - 1)))
+            order.extend((x, 0) for x in range(width - 2, 0, -1))
+            cycle = Autopilot._link(order, width, height)
+            cycle[width - 1] = width - 2
+            return tuple(cycle)
+        transpose = height % 2 == 1
+        if transpose:
+            width, height = height, width
+        order = [(0, 0)]
+        for y in range(height):
+            columns = range(1, width)
+            order.extend((x, y) for x in (columns if y % 2 == 0
+                                          else reversed(columns)))
+        order.extend((0, y) for y in range(height - 1, 0, -1))
+        if transpose:
+            order = [(y, x) for x, y in order]
+            width, height = height, width
+        return tuple(Autopilot._link(order, width, height))
+
+    @staticmethod
+    def _link(order, width, height):
+        """Returns a list where item i is the cell after cell i
+        in the cycle of the cells in the order.
+
+        """
+        cycle = [0] * (width * height)
+        for (x, y), (next_x, next_y) in zip(order, order[1:] + order[:1]):
+            cycle[y * width + x] = next_y * width + next_x
+        return cycle
@@ -0,0 +1,180 @@
+"""BatchEngine class for PySnake game.
+
+This class advances many independent games at once with the rules
+of the SnakeEngine. The state of all games is kept in NumPy arrays,
+so one step of all games is a few vectorized operations.
+Requires NumPy.
+
+"""
+
+
+import numpy as np
+
+from engine import SnakeEngine
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class BatchEngine(object):
+    """Headless state of count games on width x height areas.
+
+    Cells are numbered row by row: cell = y * width + x.
+    The body of every game is a ring buffer of cells, the head is
+    at the position head and the tail is length - 1 positions before.
+    Directions are indexes of DIRECTIONS, an action -1 keeps
+    the current direction.
+
+    """
+
+    DIRECTIONS = ('Left', 'Right', 'Up', 'Down')
+    _DX = np.array([-1, 1, 0, 0], dtype=np.int64)
+    _DY = np.array([0, 0, -1, 1], dtype=np.int64)
+
+    def __init__(self, count, width, height, seed=None):
+        """Initialize an instance.
+
+        Arguments count is the number of games, width and height are
+        the size of the game area in cells, seed gives every game
+        its own stream of random numbers for the apples.
+
+        """
+        self.count = count
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.grid = np.zeros((count, self.cells), dtype=np.bool_)
+        self.body = np.zeros((count, self.cells), dtype=np.int64)
+        self.head = np.zeros(count, dtype=np.int64)
+        self.length = np.zeros(count, dtype=np.int64)
+        self.direction = np.zeros(count, dtype=np.int64)
+        self.apple = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.done = np.zeros(count, dtype=np.bool_)
+        self.won = np.zeros(count, dtype=np.bool_)
+        self._grow = np.zeros(count, dtype=np.int64)
+        self._games = np.arange(count)
+        self._rng_state = np.random.SeedSequence(seed).generate_state(
+            count, dtype=np.uint64
+        )
+        self.reset()
+
+    def reset(self, games=None):
+        """Puts the games into the initial state.
+
+        Argument games is an array of indexes or a boolean mask,
+        None resets all games.
+
+        """
+        games = self._indexes(games)
+        head_x, head_y = SnakeEngine.HEAD_POSITION
+        start = np.array([
+            head_y * self.width + head_x - offset
+            for offset in reversed(range(SnakeEngine.SNAKE_LEN))
+        ])
+        self.grid[games] = False
+        self.grid[games[:, None], start] = True
+        self.body[games, :len(start)] = start
+        self.head[games] = len(start) - 1
+        self.length[games] = len(start)
+        self.direction[games] = BatchEngine.DIRECTIONS.index('Right')
+        self.score[games] = 0
+        self.ticks[games] = 0
+        self.done[games] = False
+        self.won[games] = False
+        self._grow[games] = 0
+        self._place_apples(games)
+
+    def step(self, actions=None):
+        """Advances all games that are not over by one tick.
+
+        Argument actions is an array of count directions, only
+        a perpendicular turn changes the direction of a game.
+        Returns two boolean arrays: the games where the apple
+        was eaten and the games that are over.
+
+        """
+        games = self._games
+        alive = ~self.done
+        if actions is not None:
+            actions = np.asarray(actions)
+            turn = (alive & (actions >= 0) &
+                    (actions // 2 != self.direction // 2))
+            self.direction = np.where(turn, actions, self.direction)
+        head = self.body[games, self.head]
+        new_x = head % self.width + BatchEngine._DX[self.direction]
+        new_y = head // self.width + BatchEngine._DY[self.direction]
+        inside = (
+            (new_x >= 0) & (new_x < self.width) &
+            (new_y >= 0) & (new_y < self.height)
+        )
+        new_head = np.where(inside, new_y * self.width + new_x, 0)
+        grow = self._grow > 0
+        leave = games[alive & ~grow]
+        tail = (self.head[leave] - self.length[leave] + 1) % self.cells
+        self.grid[leave, self.body[leave, tail]] = False
+        crash = alive & (~inside | self.grid[games, new_head])
+        self.done |= crash
+        self.ticks[alive] += 1
+        move = alive & ~crash
+        moved = games[move]
+        self.head[moved] = (self.head[moved] + 1) % self.cells
+        self.body[moved, self.head[moved]] = new_head[moved]
+        self.grid[moved, new_head[moved]] = True
+        grown = move & grow
+        self.length[grown] += 1
+        self._grow[grown] -= 1
+        ate = move & (new_head == self.apple)
+        self.score[ate] += 1
+        self._grow[ate] += 1
+        self._place_apples(games[ate])
+        return ate, self.done
+
+    def _indexes(self, games):
+        """Converts a mask or None to an array of indexes."""
+
+        if games is None:
+            return self._games
+        games = np.asarray(games)
+        if games.dtype == np.bool_:
+            return np.flatnonzero(games)
+        return games
+
+    def _place_apples(self, games):
+        """Places new apples in the games, ends the games without
+        free cells. A random cell is taken if it is free, otherwise
+        the apple is placed into a uniformly chosen free cell.
+
+        """
+        free = self.cells - self.length[games]
+        full = games[free == 0]
+        self.apple[full] = -1
+        self.won[full] = True
+        self.done[full] = True
+        games, free = games[free > 0], free[free > 0]
+        if not len(games):
+            return
+        apple = (self._random(games) % np.uint64(self.cells)).astype(np.int64)
+        taken = self.grid[games, apple]
+        if taken.any():
+            busy = games[taken]
+            nth = self._random(busy) % free[taken].astype(np.uint64)
+            free_cells = np.cumsum(~self.grid[busy], axis=1)
+            apple[taken] = np.argmax(
+                free_cells > nth.astype(np.int64)[:, None], axis=1
+            )
+        self.apple[games] = apple
+
+    def _random(self, games):
+        """Returns the next random numbers of the games (SplitMix64)."""
+
+        state = self._rng_state[games] + np.uint64(0x9E3779B97F4A7C15)
+        self._rng_state[games] = state
+        state = (state ^ (state >> np.uint64(30))) * \
+            np.uint64(0xBF58476D1CE4E5B9)
+        state = (state ^ (state >> np.uint64(27))) * \
+            np.uint64(0x94D049BB133111EB)
+        return state ^ (state >> np.uint64(31))
@@ -0,0 +1,361 @@
+"""Benchmarks of PySnake game.
+
+This module measures the cost of the game logic, the rendering and the
+score database against the size of the snake, the fill ratio of the
+game area and the size of the database. The results (seconds per
+operation) are written as JSON and can be compared with a baseline:
+the exit status is 1 if any operation is slower than the baseline by
+more than the threshold, or if the cost of an operation grows with its
+parameter (for example the length of the snake) faster than in the
+baseline, which catches the changes of complexity.
+
+The rendering is measured on a real Tk canvas with --tk (run it under
+Xvfb on a machine without a display), otherwise on FakeCanvas.
+
+"""
+
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from collections import deque
+from tkinter import Canvas, Tk
+
+from engine import SnakeEngine
+from gui import ItemPool, Snake, SnakeSegment
+from level import Level
+from score_db import ScoreDb
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class FakeCanvas(object):
+    """Stand-in for the Canvas with the methods used by the ItemPool."""
+
+    def __init__(self):
+        """Initialize an instance."""
+
+        self._items = {}
+        self._last_id = 0
+
+    def create_rectangle(self, *coord, **options):
+        self._last_id += 1
+        self._items[self._last_id] = list(coord)
+        return self._last_id
+
+    def coords(self, item, *coord):
+        if coord:
+            self._items[item] = list(coord[0])
+        return self._items[item]
+
+    def itemconfigure(self, item, **options):
+        pass
+
+
+class Benchmark(object):
+    """Runs the benchmarks and collects the results."""
+
+    SNAKE_LENGTHS = (10, 100, 1000)
+    FILL_RATIOS = (0.1, 0.5, 0.9, 0.99)
+    WALL_RATIOS = (0.1, 0.5, 0.9)
+    DB_SIZES = (100, 1000, 10000)
+    AREA_SIZE = (100, 100)
+
+    def __init__(self, canvas, repeat=5, duration=0.05):
+        """Initialize an instance.
+
+        Argument canvas is instance of the Canvas or FakeCanvas
+        (the segments are taken from an ItemPool of the canvas),
+        all benchmarks are run repeat times in batches of calls
+        of about duration seconds, the best time is taken.
+
+        """
+        self.pool = ItemPool(canvas)
+        self.repeat = repeat
+        self.duration = duration
+        self.results = {}
+        self._numbers = {}
+
+    def run(self):
+        """Runs all benchmarks, returns the results.
+        The runs of a benchmark are spread over the whole time of
+        the benchmarks, so a short slowdown of the machine does not
+        spoil all of them.
+
+        """
+        for _ in range(self.repeat):
+            for length in Benchmark.SNAKE_LENGTHS:
+                self.bench_snake_sync(length)
+            for ratio in Benchmark.FILL_RATIOS:
+                self.bench_engine(ratio)
+            for ratio in Benchmark.WALL_RATIOS:
+                self.bench_level(ratio)
+            self.bench_segment_churn()
+            for size in Benchmark.DB_SIZES:
+                self.bench_score_db(size)
+        return self.results
+
+    def measure(self, name, operation, setup=None, teardown=None):
+        """Measures the time of one call of the operation,
+        keeps the best time of the runs.
+
+        Argument setup is called before the run and returns
+        the argument of the operation, teardown is called with
+        the argument after the run.
+
+        """
+        argument = setup() if setup is not None else None
+        if name not in self._numbers:
+            self._numbers[name] = self._batch_size(operation, argument)
+        number = self._numbers[name]
+        elapsed = Benchmark._time_batch(operation, argument, number)
+        if teardown is not None:
+            teardown(argument)
+        if name not in self.results or elapsed / number < self.results[name]:
+            self.results[name] = elapsed / number
+
+    def _batch_size(self, operation, argument):
+        """Returns the number of calls of the operation that take
+        at least duration seconds (1, 2, 5, 10, 20, 50...), so the
+        clock is read once per batch, not once per call.
+
+        """
+        for power in itertools.count():
+            for factor in (1, 2, 5):
+                number = factor * 10 ** power
+                if Benchmark._time_batch(
+                        operation, argument, number) >= self.duration:
+                    return number
+
+    @staticmethod
+    def _time_batch(operation, argument, number):
+        """Returns the time of number calls of the operation,
+        the garbage collector is disabled like in timeit.
+
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(number):
+                operation(argument)
+            return time.perf_counter() - start
+        finally:
+            if enabled:
+                gc.enable()
+
+    def bench_snake_sync(self, length):
+        """Snake.sync of one step against the length of the snake."""
+
+        width, height = Benchmark.AREA_SIZE
+        cells = [
+            (x if y % 2 == 0 else width - 1 - x, y)
+            for y in range(height) for x in range(width)
+        ]
+
+        def setup():
+            body = deque(reversed(cells[:length]))
+            path = itertools.cycle(cells)
+            for _ in range(length):
+                next(path)
+            return body, Snake(self.pool, body), path
+
+        def sync(argument):
+            body, snake, path = argument
+            body.appendleft(next(path))
+            body.pop()
+            snake.sync(body, 1)
+
+        def clear(argument):
+            # The segments go back to the pool, so the runs do not
+            # leave rectangles on the canvas.
+            argument[1].clear()
+
+        self.measure(
+            'Snake.sync[length=%d]' % length, sync, setup, clear
+        )
+
+    def bench_engine(self, ratio):
+        """SnakeEngine._create_apple and _snake_crush
+        against the fill ratio of the game area.
+
+        """
+        width, height = Benchmark.AREA_SIZE
+
+        def setup():
+            engine = SnakeEngine(width, height, seed=0)
+            for index in range(int(width * height * ratio)):
+                if not engine.grid[index]:
+                    engine._occupy(index)
+            return engine
+
+        self.measure(
+            'SnakeEngine._create_apple[fill=%s]' % ratio,
+            lambda engine: engine._create_apple(), setup
+        )
+        self.measure(
+            'SnakeEngine._snake_crush[fill=%s]' % ratio,
+            lambda engine: engine._snake_crush(), setup
+        )
+
+    def bench_level(self, ratio):
+        """SnakeEngine._create_apple and _snake_crush
+        against the ratio of the game area covered by walls.
+
+        """
+        width, height = Benchmark.AREA_SIZE
+        rand = random.Random(0)
+        start_row = SnakeEngine.HEAD_POSITION[1]
+        level = Level([
+            ''.join(
+                '#' if y != start_row and rand.random() < ratio else '.'
+                for _ in range(width)
+            )
+            for y in range(height)
+        ])
+
+        def setup():
+            return SnakeEngine(width, height, seed=0, level=level)
+
+        self.measure(
+            'SnakeEngine._create_apple[walls=%s]' % ratio,
+            lambda engine: engine._create_apple(), setup
+        )
+        self.measure(
+            'SnakeEngine._snake_crush[walls=%s]' % ratio,
+            lambda engine: engine._snake_crush(), setup
+        )
+
+    def bench_segment_churn(self):
+        """Creation and release of a Segment."""
+
+        self.measure(
+            'Segment.churn',
+            lambda _: SnakeSegment(self.pool, (0, 0)).release()
+        )
+
+    def bench_score_db(self, size):
+        """ScoreDb.get_scores and add_score against the size of the db."""
+
+        directory = tempfile.mkdtemp()
+        try:
+            score_db = ScoreDb(os.path.join(directory, 'bench'))
+            for player in range(size):
+                score_db.add_score('Player%d' % player, player % 997)
+            score_db.flush()
+            self.measure(
+                'ScoreDb.get_scores[size=%d]' % size,
+                lambda _: score_db.get_scores()
+            )
+            self.measure(
+                'ScoreDb.get_top_score[size=%d]' % size,
+                lambda _: score_db.get_top_score()
+            )
+
+            def add_score(_):
+                score_db.add_score('Player%d' % (size // 2), size)
+                score_db.flush()
+
+            self.measure('ScoreDb.add_score[size=%d]' % size, add_score)
+            score_db.close()
+        finally:
+            shutil.rmtree(directory)
+
+    @staticmethod
+    def scaling(results):
+        """Returns a dict of the ratios of the time of an operation
+        at the largest value of its parameter to the time at the
+        smallest one, keyed by 'name[parameter=largest/smallest]'.
+
+        """
+        families = {}
+        for name, result in results.items():
+            operation, _, parameter = name.rstrip(']').partition('[')
+            key, _, value = parameter.partition('=')
+            if value:
+                families.setdefault((operation, key), []).append(
+                    (float(value), value, result)
+                )
+        ratios = {}
+        for (operation, key), points in sorted(families.items()):
+            if len(points) > 1:
+                points.sort()
+                ratios['%s[%s=%s/%s]' % (
+                    operation, key, points[-1][1], points[0][1]
+                )] = points[-1][2] / points[0][2]
+        return ratios
+
+    @staticmethod
+    def compare(results, baseline, threshold):
+        """Returns the list of (name, result, baseline) of the operations
+        slower than the baseline by more than the threshold (a fraction)
+        and of the scaling() ratios grown by more than the threshold.
+
+        """
+        results = dict(results, **Benchmark.scaling(results))
+        baseline = dict(baseline, **Benchmark.scaling(baseline))
+        return [
+            (name, result, baseline[name])
+            for name, result in sorted(results.items())
+            if name in baseline and result > baseline[name] * (1 + threshold)
+        ]
+
+
+def parse_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description='PySnake benchmarks')
+    parser.add_argument(
+        '--tk', action='store_true',
+        help='render on a real Tk canvas (needs a display or Xvfb)'
+    )
+    parser.add_argument(
+        '--output', metavar='PATH',
+        help='write the results to PATH (JSON) instead of stdout'
+    )
+    parser.add_argument(
+        '--baseline', metavar='PATH',
+        help='compare the results with the baseline in PATH (JSON)'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=0.5,
+        help='allowed slowdown against the baseline (default: 0.5)'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='number of runs of every benchmark (default: 5)'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    canvas = Canvas(Tk()) if args.tk else FakeCanvas()
+    results = Benchmark(canvas, repeat=args.repeat).run()
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=4, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=4, sort_keys=True)
+        print()
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = Benchmark.compare(
+                results, json.load(baseline_file), args.threshold
+            )
+        for name, result, baseline in regressions:
+            print('REGRESSION %s: %.3g (baseline %.3g)' % (
+                name, result, baseline
+            ), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,168 @@
+"""NetworkGame class for PySnake game.
+
+This class is a thin client of the multiplayer server (server.py):
+it sends the turns of the player and draws the changed cells of the
+shared board on the BitmapBoard of the GuiApp. The server is the only
+authority on the state of the board.
+
+"""
+
+
+import json
+import queue
+import socket
+import threading
+
+from engine import SnakeEngine
+from gui import Apple, SnakeSegment
+from server import APPLE, FREE
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class NetworkGame(object):
+    """Client of the multiplayer server."""
+
+    OTHER_COLOR = '#ABF54E'
+    _POLL_DELAY = 10
+    _SPAWN_DELAY = 3000
+
+    def __init__(self, host, port):
+        """Initialize an instance: connects to the server
+        and reads the board.
+
+        Arguments host and port are the address of the server.
+
+        """
+        self._socket = socket.create_connection((host, port))
+        self._file = self._socket.makefile('rb')
+        self._state = self._read()
+        if self._state is None:
+            raise ConnectionError('the server is full')
+        self.grid_size = (self._state['w'], self._state['h'])
+        self._messages = queue.Queue()
+        self._gui = None
+        self._id = None
+        self._scores = {}
+
+    def start(self, gui_app):
+        """Shows the board and starts to play.
+
+        Argument gui_app is instance of the GuiApp class
+        with the BitmapBoard of grid_size.
+
+        """
+        self._gui = gui_app
+        self._gui.bind(None, None, self._close_root)
+        self._gui.show_game()
+        self._gui.bind_keys(self._change_direction)
+        threading.Thread(
+            target=self._read_loop, name='NetworkGameReader', daemon=True
+        ).start()
+        self._apply(self._state)
+        self._poll()
+
+    def _read(self):
+        """Reads a message from the server, None at the end."""
+
+        line = self._file.readline()
+        return json.loads(line) if line else None
+
+    def _read_loop(self):
+        """Queues the messages of the server.
+        Runs in the reader thread until the connection is closed.
+
+        """
+        try:
+            while True:
+                message = self._read()
+                self._messages.put(message)
+                if message is None:
+                    break
+        except (OSError, ValueError):
+            self._messages.put(None)
+
+    def _send(self, message):
+        """Sends a message to the server."""
+
+        try:
+            self._socket.sendall(json.dumps(message).encode() + b'\n')
+        except OSError:
+            pass
+
+    def _poll(self):
+        """Draws the queued messages of the server."""
+
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if message is None:
+                self._gui.show_message('Disconnected')
+                return
+            self._apply(message)
+        self._gui.after(NetworkGame._POLL_DELAY, self._poll)
+
+    def _apply(self, message):
+        """Draws the changes of the board."""
+
+        board = self._gui.board
+        width = self.grid_size[0]
+        if 'w' in message:
+            board.clear()
+            self._id = message['id']
+            self._scores.clear()
+            if self._id is None:
+                self._schedule_spawn()
+        cells = message['c']
+        for position in range(0, len(cells), 2):
+            cell, owner = cells[position], cells[position + 1]
+            if owner == FREE:
+                color = None
+            elif owner == APPLE:
+                color = Apple.COLOR
+            elif owner == self._id:
+                color = SnakeSegment.COLOR
+            else:
+                color = NetworkGame.OTHER_COLOR
+            board.fill((cell % width, cell // width), color)
+        for snake_id, score in message['s'].items():
+            self._scores[int(snake_id)] = score
+        for snake_id in message.get('d', ()):
+            self._scores.pop(snake_id, None)
+        if self._id is not None and self._id in message.get('d', ()):
+            self._gui.show_game_over()
+            self._schedule_spawn()
+        elif self._id is not None:
+            self._update_score()
+
+    def _update_score(self):
+        """Updates the score and the number of players
+        above the game area.
+
+        """
+        self._gui.show_message('Score: %d\t\tPlayers: %d' % (
+            self._scores.get(self._id, 0), len(self._scores)
+        ))
+
+    def _schedule_spawn(self):
+        """Asks the server for a new snake after a delay."""
+
+        self._id = None
+        self._gui.after(NetworkGame._SPAWN_DELAY, self._send, {'spawn': True})
+
+    def _change_direction(self, key):
+        """Sends the change of the direction of the snake."""
+
+        if key in SnakeEngine.DIRECTIONS:
+            self._send({'turn': key})
+
+    def _close_root(self):
+        """Actions at the closing of the root window."""
+
+        self._socket.close()
+        self._gui.destroy()
@@ -0,0 +1,437 @@
+"""SnakeEngine class for PySnake game.
+
+This class implements the rules of the game: the snake body,
+the apple, the score and the end of the game. It knows nothing
+about tkinter, works in grid cells instead of pixels and can be
+stepped without a display (for bots and regression tests).
+The state can be cloned for lookahead, and with a rewind buffer
+every step keeps only what it changed, so the last ticks can be
+undone and a snapshot restored at the cost of the changes since it.
+The walls of a Level are copied into the occupancy grid and removed
+from the free cells at every reset, a step does not look at them.
+
+"""
+
+
+import itertools
+import random
+
+from collections import deque, namedtuple
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+_Undo = namedtuple('_Undo', (
+    'state direction turns grow apple score speed ate '
+    'tail head_position random_state'
+))
+
+# Ids of the states for the snapshots. They only grow and are never
+# rewound, so a state made after a rewind never takes the id
+# of a state that was undone.
+_STATE_IDS = itertools.count(1)
+
+
+class FreeCells(object):
+    """Index of the cells not occupied by the snake.
+    Cells are kept in a list, removal swaps the cell with the last one,
+    the positions list maps a cell index to its place in the list
+    (-1 for occupied cells). All operations are O(1).
+
+    """
+
+    def __init__(self, size):
+        """Initialize an instance.
+
+        Argument size is the number of cells of the game area.
+
+        """
+        self._cells = list(range(size))
+        self._positions = list(range(size))
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, index):
+        return self._positions[index] != -1
+
+    def add(self, index):
+        """Marks the cell as free."""
+
+        if self._positions[index] == -1:
+            self._positions[index] = len(self._cells)
+            self._cells.append(index)
+
+    def remove(self, index):
+        """Marks the cell as occupied.
+        Returns the place of the cell in the list, for insert().
+
+        """
+        position = self._positions[index]
+        if position != -1:
+            last = self._cells.pop()
+            if last != index:
+                self._cells[position] = last
+                self._positions[last] = position
+            self._positions[index] = -1
+        return position
+
+    def insert(self, index, position):
+        """Undoes the last remove() of the cell, which returned
+        the position, so the order of the cells is restored too.
+
+        """
+        if position == len(self._cells):
+            self._cells.append(index)
+        else:
+            moved = self._cells[position]
+            self._positions[moved] = len(self._cells)
+            self._cells.append(moved)
+            self._cells[position] = index
+        self._positions[index] = position
+
+    def copy(self):
+        """Returns an independent copy."""
+
+        free = FreeCells.__new__(FreeCells)
+        free._cells = self._cells[:]
+        free._positions = self._positions[:]
+        return free
+
+    def sample(self, rand):
+        """Returns a uniformly chosen free cell index.
+
+        Argument rand is instance of the random.Random.
+
+        """
+        return self._cells[rand.randrange(len(self._cells))]
+
+
+class SnakeEngine(object):
+    """Headless game state.
+    The object of this class is controlled instance of the Game.
+
+    """
+
+    DIRECTIONS = {
+        'Left': (-1, 0),
+        'Right': (1, 0),
+        'Up': (0, -1),
+        'Down': (0, 1)
+    }
+    SNAKE_LEN = 3
+    HEAD_POSITION = (3, 3)
+    SPEED = 400
+    TURNS_QUEUE_LEN = 3
+    MIN_SIZE = 5
+    MAX_SIZE = 1000
+
+    def __init__(self, width, height, seed=None, history=0, level=None):
+        """Initialize an instance.
+
+        Arguments width and height are the size of the game area
+        in cells, seed is passed to the random generator of apples,
+        history is the number of the last ticks that can be undone,
+        level is a Level of the same size with the walls.
+
+        """
+        if level is not None and level.size != (width, height):
+            raise ValueError('the level does not fit the game area')
+        self.width = width
+        self.height = height
+        self.level = level
+        self.random = random.Random(seed)
+        self.grid = None
+        self.free = None
+        self.body = None
+        self.direction = None
+        self.apple = None
+        self.score = 0
+        self.speed = SnakeEngine.SPEED
+        self.ticks = 0
+        self.done = False
+        self.won = False
+        self.ate = False
+        self._grow = 0
+        self._turns = deque()
+        self._journal = deque(maxlen=history) if history else None
+        self._state = None
+        self.reset()
+
+    def reset(self):
+        """Puts the game into the initial state."""
+
+        head_x, head_y = SnakeEngine.HEAD_POSITION
+        self.body = deque(
+            (head_x - offset, head_y)
+            for offset in range(SnakeEngine.SNAKE_LEN)
+        )
+        if self.level is not None:
+            self.grid = bytearray(self.level.grid)
+            self.free = self.level.free.copy()
+        else:
+            self.grid = bytearray(self.width * self.height)
+            self.free = FreeCells(self.width * self.height)
+        for cell in self.body:
+            self._occupy(self._index(cell))
+        self.direction = SnakeEngine.DIRECTIONS['Right']
+        self.score = 0
+        self.speed = SnakeEngine.SPEED
+        self.ticks = 0
+        self.done = False
+        self.won = False
+        self.ate = False
+        self._grow = 0
+        self._turns.clear()
+        if self._journal is not None:
+            self._journal.clear()
+        self._state = next(_STATE_IDS)
+        self.apple = self._create_apple()
+
+    def turn(self, direction):
+        """Queues a change of the direction for the next ticks.
+
+        Argument direction is a key of DIRECTIONS. Not more than
+        TURNS_QUEUE_LEN turns are kept, a repeated turn is ignored.
+
+        """
+        queue_turn(self._turns, SnakeEngine.DIRECTIONS[direction])
+
+    def step(self, direction=None):
+        """Advances the game by one tick.
+
+        Argument direction is a key of DIRECTIONS, it is queued
+        like a turn(). None keeps the current direction. Every tick
+        takes the first queued turn that is neither the current
+        direction nor the reverse of it. Returns True if the game
+        is over: the snake crashed or (won is True) filled the area.
+
+        """
+        if self.done:
+            return True
+        journal = self._journal
+        if journal is not None:
+            before = (
+                self._state, self.direction, tuple(self._turns),
+                self._grow, self.apple, self.score, self.speed, self.ate
+            )
+            tail = None
+            head_position = -1
+            random_state = None
+        if direction is not None:
+            self.turn(direction)
+        self.direction = take_turn(self._turns, self.direction)
+        self.ticks += 1
+        self.ate = False
+        head_x, head_y = self.body[0]
+        head = (head_x + self.direction[0], head_y + self.direction[1])
+        if self._grow:
+            self._grow -= 1
+        else:
+            tail = self.body.pop()
+            self._release(self._index(tail))
+        self.body.appendleft(head)
+        if self._snake_crush():
+            self.done = True
+        else:
+            head_position = self._occupy(self._index(head))
+            if head == self.apple:
+                self.ate = True
+                self.score += 1
+                self._grow += 1
+                self._change_speed()
+                if journal is not None:
+                    random_state = self.random.getstate()
+                self.apple = self._create_apple()
+                if self.apple is None:
+                    self.won = self.done = True
+        if journal is not None:
+            journal.append(_Undo(*before, tail, head_position, random_state))
+        self._state = next(_STATE_IDS)
+        return self.done
+
+    def snapshot(self):
+        """Returns a snapshot of the current state for restore().
+        Takes O(1), the state stays restorable while its ticks
+        are in the rewind buffer.
+
+        """
+        return self._state, tuple(self._turns)
+
+    def restore(self, snapshot):
+        """Undoes the steps made after the snapshot.
+        Raises ValueError if the snapshot is not in the rewind buffer.
+
+        """
+        state, turns = snapshot
+        if state != self._state:
+            journal = self._journal or ()
+            for depth, undo in enumerate(reversed(journal), 1):
+                if undo.state == state:
+                    break
+            else:
+                raise ValueError('the snapshot is not in the rewind buffer')
+            self.rewind(depth)
+        self._turns.clear()
+        self._turns.extend(turns)
+
+    def rewind(self, ticks=1):
+        """Undoes up to ticks last steps.
+        Returns the number of the undone steps.
+
+        """
+        journal = self._journal
+        count = 0
+        while journal and count < ticks:
+            self._undo(journal.pop())
+            count += 1
+        return count
+
+    def clone(self):
+        """Returns an independent copy of the game
+        with the same random generator state and rewind buffer.
+
+        """
+        engine = SnakeEngine.__new__(SnakeEngine)
+        engine.__dict__.update(self.__dict__)
+        engine.random = random.Random()
+        engine.random.setstate(self.random.getstate())
+        engine.grid = bytearray(self.grid)
+        engine.free = self.free.copy()
+        engine.body = deque(self.body)
+        engine._turns = deque(self._turns)
+        if self._journal is not None:
+            engine._journal = deque(self._journal, self._journal.maxlen)
+        return engine
+
+    def is_free(self, cell):
+        """Returns True if the cell is inside the game area
+        and is not occupied by the snake or a wall.
+
+        """
+        x, y = cell
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return not self.grid[y * self.width + x]
+
+    def _snake_crush(self):
+        """Checks snake crush.
+        The occupancy grid already has the tail removed and the head
+        not yet added, so the check does not depend on the snake length.
+
+        """
+        return not self.is_free(self.body[0])
+
+    def _undo(self, undo):
+        """Restores the state before the step of the undo record."""
+
+        head = self.body.popleft()
+        if undo.head_position != -1:
+            index = self._index(head)
+            self.grid[index] = 0
+            self.free.insert(index, undo.head_position)
+        if undo.tail is not None:
+            self.body.append(undo.tail)
+            self._occupy(self._index(undo.tail))
+        if undo.random_state is not None:
+            self.random.setstate(undo.random_state)
+        self._state = undo.state
+        self.direction = undo.direction
+        self._turns.clear()
+        self._turns.extend(undo.turns)
+        self._grow = undo.grow
+        self.apple = undo.apple
+        self.score = undo.score
+        self.speed = undo.speed
+        self.ate = undo.ate
+        self.ticks -= 1
+        self.done = self.won = False
+
+    def _index(self, cell):
+        """Returns the index of the cell in the occupancy grid."""
+
+        return cell[1] * self.width + cell[0]
+
+    def _occupy(self, index):
+        """Marks the cell as occupied by the snake.
+        Returns the place of the cell in the list of free cells.
+
+        """
+        self.grid[index] = 1
+        return self.free.remove(index)
+
+    def _release(self, index):
+        """Marks the cell as left by the snake."""
+
+        self.grid[index] = 0
+        self.free.add(index)
+
+    def _create_apple(self):
+        """Creating new apple.
+        Returns None if the snake fills the whole game area.
+
+        """
+        if not self.free:
+            return None
+        return divmod(self.free.sample(self.random), self.width)[::-1]
+
+    def _change_speed(self):
+        """Changes the speed of the snake,
+        the period of a step does not go below 1 ms.
+
+        """
+        if self.speed > 150:
+            self.speed -= 10
+        elif 80 < self.speed <= 150:
+            self.speed -= 5
+        elif 20 < self.speed <= 80:
+            self.speed -= 2
+        else:
+            self.speed = max(self.speed - 1, 1)
+
+
+def queue_turn(turns, direction):
+    """Queues the direction (a value of SnakeEngine.DIRECTIONS)
+    to the deque turns. Not more than TURNS_QUEUE_LEN turns are kept,
+    a repeated turn is ignored.
+
+    """
+    if len(turns) >= SnakeEngine.TURNS_QUEUE_LEN:
+        return
+    if not turns or turns[-1] != direction:
+        turns.append(direction)
+
+
+def take_turn(turns, direction):
+    """Returns the direction of the next step of a snake moving
+    in direction: the first turn of the deque turns that is neither
+    direction nor the reverse of it, the turns before it are dropped.
+
+    """
+    while turns:
+        turn = turns.popleft()
+        # Only a perpendicular turn is valid.
+        if turn[0] * direction[0] + turn[1] * direction[1] == 0:
+            return turn
+    return direction
+
+
+def parse_size(value, max_size=SnakeEngine.MAX_SIZE):
+    """Converts the string COLUMNSxROWS to a tuple.
+    Raises ValueError if it is wrong or the columns and rows
+    are not from MIN_SIZE to max_size.
+
+    """
+    try:
+        columns, rows = (int(number) for number in value.lower().split('x'))
+    except ValueError:
+        raise ValueError('expected COLUMNSxROWS')
+    if not (SnakeEngine.MIN_SIZE <= columns <= max_size and
+            SnakeEngine.MIN_SIZE <= rows <= max_size):
+        raise ValueError('columns and rows must be from %d to %d' % (
+            SnakeEngine.MIN_SIZE, max_size
+        ))
+    return columns, rows
@@ -0,0 +1,200 @@
+"""Reinforcement-learning environments of PySnake game.
+
+SnakeEnv plays one game of the SnakeEngine, VectorSnakeEnv plays many
+games of the BatchEngine at once; both follow the API of Gymnasium:
+reset(seed) returns (observation, info), step(action) returns
+(observation, reward, terminated, truncated, info).
+
+The observation is a read-only NumPy view of a grid buffer of the
+environment, a cell holds EMPTY, BODY, HEAD or APPLE. The buffer is
+updated in place by every step (only the changed cells are written),
+so no array is copied or built per step: copy the observation to keep
+it. Actions are indexes of SnakeEngine.DIRECTIONS, a reward is 1 for
+an apple, -1 for a crash and 0 otherwise.
+Requires NumPy.
+
+"""
+
+
+import random
+
+import numpy as np
+
+from batch_engine import BatchEngine
+from engine import SnakeEngine
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+EMPTY = 0
+BODY = 1
+HEAD = 2
+APPLE = 3
+ACTIONS = tuple(SnakeEngine.DIRECTIONS)
+
+
+class SnakeEnv(object):
+    """Environment of one game."""
+
+    def __init__(self, width=25, height=25, max_steps=None):
+        """Initialize an instance.
+
+        Arguments width and height are the size of the game area
+        in cells, an episode is truncated after max_steps steps.
+
+        """
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+        self.action_count = len(ACTIONS)
+        self.observation_shape = (height, width)
+        self.engine = None
+        self._random = random.Random()
+        self._grid = np.zeros(self.observation_shape, dtype=np.uint8)
+        self._cells = self._grid.reshape(-1)
+        self.observation = self._grid.view()
+        self.observation.flags.writeable = False
+
+    def reset(self, seed=None):
+        """Starts a new episode, returns (observation, info).
+
+        Argument seed seeds the random generator of the environment,
+        every episode gets a new seed of the SnakeEngine from it.
+
+        """
+        if seed is not None:
+            self._random.seed(seed)
+        engine = self.engine = SnakeEngine(
+            self.width, self.height, self._random.getrandbits(64)
+        )
+        self._cells[:] = EMPTY
+        for cell in engine.body:
+            self._cells[self._index(cell)] = BODY
+        self._cells[self._index(engine.body[0])] = HEAD
+        self._cells[self._index(engine.apple)] = APPLE
+        return self.observation, {'score': 0}
+
+    def step(self, action):
+        """Advances the game by one tick in the direction
+        ACTIONS[action]. Returns (observation, reward, terminated,
+        truncated, info).
+
+        """
+        engine = self.engine
+        if engine.done:
+            raise RuntimeError('the episode is over, call reset()')
+        head = engine.body[0]
+        tail = engine.body[-1]
+        length = len(engine.body)
+        engine.step(ACTIONS[action])
+        if engine.done and not engine.won:
+            reward = -1.0
+        else:
+            cells = self._cells
+            if len(engine.body) == length:
+                cells[self._index(tail)] = EMPTY
+            cells[self._index(head)] = BODY
+            cells[self._index(engine.body[0])] = HEAD
+            reward = 0.0
+            if engine.ate:
+                reward = 1.0
+                if engine.apple is not None:
+                    cells[self._index(engine.apple)] = APPLE
+        truncated = (self.max_steps is not None and
+                     engine.ticks >= self.max_steps and not engine.done)
+        return (self.observation, reward, engine.done, truncated,
+                {'score': engine.score})
+
+    def _index(self, cell):
+        """Returns the index of the cell in the buffer."""
+
+        return cell[1] * self.width + cell[0]
+
+
+class VectorSnakeEnv(object):
+    """Environment of count games advanced at once.
+    A game that is over is reset automatically; its final score
+    is in info['final_score'], the observation shows the new game.
+
+    """
+
+    def __init__(self, count, width=25, height=25, max_steps=None):
+        """Initialize an instance.
+
+        Argument count is the number of games, width and height are
+        the size of the game area in cells, an episode is truncated
+        after max_steps steps.
+
+        """
+        self.count = count
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+        self.action_count = len(ACTIONS)
+        self.observation_shape = (count, height, width)
+        self.engine = None
+        self._grid = np.zeros(self.observation_shape, dtype=np.uint8)
+        self._cells = self._grid.reshape(count, -1)
+        self._games = np.arange(count)
+        self.observation = self._grid.view()
+        self.observation.flags.writeable = False
+
+    def reset(self, seed=None):
+        """Starts new episodes of all games,
+        returns (observation, info).
+
+        """
+        self.engine = BatchEngine(self.count, self.width, self.height, seed)
+        self._redraw(self._games)
+        return self.observation, {'score': self.engine.score}
+
+    def step(self, actions):
+        """Advances all games by one tick. Argument actions is
+        an array of count indexes of ACTIONS, -1 keeps the direction.
+        Returns (observation, rewards, terminated, truncated, info).
+
+        """
+        engine = self.engine
+        games = self._games
+        cells = self._cells
+        alive = ~engine.done
+        position = engine.head.copy()
+        length = engine.length.copy()
+        head = engine.body[games, position]
+        tail = engine.body[games, (position - length + 1) % engine.cells]
+        ate, done = engine.step(actions)
+        terminated = done.copy()
+        moved = alive & (engine.head != position)
+        left = moved & (engine.length == length)
+        cells[left, tail[left]] = EMPTY
+        cells[moved, head[moved]] = BODY
+        cells[moved, engine.body[moved, engine.head[moved]]] = HEAD
+        placed = ate & (engine.apple >= 0)
+        cells[placed, engine.apple[placed]] = APPLE
+        rewards = ate.astype(np.float32)
+        rewards[terminated & ~engine.won] = -1.0
+        truncated = np.zeros(self.count, dtype=np.bool_)
+        if self.max_steps is not None:
+            truncated = ~terminated & (engine.ticks >= self.max_steps)
+        info = {'final_score': np.where(
+            terminated | truncated, engine.score, -1
+        )}
+        finished = games[terminated | truncated]
+        if len(finished):
+            engine.reset(finished)
+            self._redraw(finished)
+        info['score'] = engine.score
+        return self.observation, rewards, terminated, truncated, info
+
+    def _redraw(self, games):
+        """Writes the whole grid of the games into the buffer."""
+
+        engine = self.engine
+        cells = self._cells
+        cells[games] = engine.grid[games] * BODY
+        cells[games, engine.body[games, engine.head[games]]] = HEAD
+        placed = games[engine.apple[games] >= 0]
+        cells[placed, engine.apple[placed]] = APPLE
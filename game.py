@@ -2,22 +2,30 @@
 
 This class is essentially a wrapper, which manages all the components
 of the game:
+    - SnakeEngine;
+    - Level;
+    - Autopilot;
     - Snake;
     - Apple;
     - ScoreDb;
-    - GuiApp.
+    - GameHistory;
+    - TickScheduler;
+    - ReplayWriter;
+    - Renderer (GuiApp or CursesApp).
 
 """
 
 
 import os
-import re
-import time
 import random
+import time
 
-from tkinter import DISABLED, StringVar
-
-from gui import *
+from autopilot import Autopilot
+from engine import SnakeEngine
+from history import GameHistory
+from renderer import Renderer
+from replay import ReplayWriter
+from scheduler import TickScheduler
 from score_db import ScoreDb
 
 
@@ -29,109 +37,221 @@ __version__ = '1.0'
 class Game(object):
     """Wrapper class."""
 
-    _SCORE_DB_PATH = os.path.join(os.path.expanduser('~'), GuiApp.TITLE)
-
-    def __init__(self, gui_app):
+    _SCORE_DB_PATH = os.path.join(os.path.expanduser('~'), Renderer.TITLE)
+    _REPLAY_PATH = os.path.join(_SCORE_DB_PATH, 'replays.psnr')
+    _HISTORY_PATH = os.path.join(_SCORE_DB_PATH, 'history.psnh')
+    _COMPACT_GAMES = 10
+    _GAME_OVER_DELAY = 3000
+    _SEGMENT_DELAY = 100
+    _SEGMENT_STEPS = 20
+    _ENTRY_DELAY = 1000
+    _FRAME_PERIOD = 16
+    _TURBO_BUDGET = 0.012
+
+    def __init__(self, gui_app, level=None):
         """Initialize an instance.
 
-        Argument gui_app is instance of the GuiApp class.
+        Argument gui_app is instance of a Renderer: the GuiApp
+        or the CursesApp, level is a Level with the walls of the game
+        area of the grid size of the gui_app.
 
         """
         self._gui = gui_app
-        self._snake = Snake(self._gui.c_game_main)
-        self._apple = self._create_apple()
+        self._level = level
+        self._seed = random.getrandbits(64)
+        self._engine = SnakeEngine(
+            *self._gui.grid_size, self._seed, level=level
+        )
+        self._snake = None
+        self._apple = None
+        self._autopilot = None
+        self._replay = None
+        self._recorder = None
         self._player = None
-        self._score = 0
-        self._score_db = Game._load_score_db()
-        self._top_score = self._score_db.get_top_score()
-
-    def start(self):
-        """Starts application."""
+        self._started = None
+        self._duration = 0
+        self._steps = 0.0
+        self._drawn_score = 0
+
+    def start(self, tick_mode=TickScheduler.SKIP, frame_stats=None,
+              autopilot=False, replays=None, replay_period=None,
+              turbo=False):
+        """Starts application.
+
+        Argument tick_mode is a mode of the TickScheduler,
+        frame_stats is a path of the file for the statistics
+        of the ticks, the file is written on exit. If autopilot
+        is True the snake is driven by the Autopilot, the games
+        follow each other and the scores are not saved.
+        Argument replays is an iterable of Replay instances to show
+        one after another instead of playing, replay_period is
+        the period of their ticks in milliseconds (by default the
+        speed of the snake). Played games are recorded
+        (except the games on a level).
+        The snake is drawn not more often than every _FRAME_PERIOD
+        milliseconds, a faster snake makes several steps per frame.
+        If turbo is True the steps are made as fast as possible
+        for _TURBO_BUDGET seconds of every frame.
+        The database with the results and the game area are
+        loaded at their first use, not at the start.
 
-        self._gui.master.protocol('WM_DELETE_WINDOW', self._close_root)
-        self._gui.btn_start['command'] = self._pre_start
-        self._gui.btn_score['command'] = self._show_top_scores
+        """
+        self._frame_stats = frame_stats
+        self._autopilot_mode = autopilot
+        self._replays = iter(replays) if replays is not None else None
+        self._replay_period = replay_period
+        self._score_db = None
+        self._history = None
+        self._logged_games = 0
+        self._top_score = 0
+        self._turbo = turbo
+        self._scheduler = TickScheduler(
+            self._gui, self._tick, self._frame_period, mode=tick_mode
+        )
+        self._gui.bind(
+            self._pre_start, self._show_top_scores, self._close_root
+        )
+        if self._level is not None:
+            self._gui.show_walls(self._level.walls)
         self._gui.show_menu()
+        if self._replays is not None:
+            self._pre_start()
 
     def _pre_start(self):
         """Actions before start the game."""
 
-        self._gui.c_game_main.bind('<KeyPress>', self._snake.change_direction)
-        self._update_top_score()
-        self._update_score()
+        if self._replays is not None:
+            if not self._load_replay():
+                return
+        self._open_score_db()
         self._gui.show_game()
+        self._snake = self._gui.create_snake(self._engine.body)
+        self._apple = self._gui.create_apple(self._engine.apple)
+        if self._replay is None:
+            if self._autopilot_mode:
+                self._autopilot = Autopilot(self._engine)
+            else:
+                self._gui.bind_keys(self._change_direction)
+            # The replay format has no walls.
+            if self._level is None:
+                self._recorder = ReplayWriter(
+                    Game._REPLAY_PATH, self._engine, self._seed
+                )
+        self._update_score()
         self._start_game()
 
     def _start_game(self):
         """Starting the game."""
 
-        self._snake.move()
-        if self._snake_crush():
-            self._game_over()
-        else:
-            if self._snake.segments[0].coord == self._apple.coord:
-                self._apple.__del__()
-                self._score += 1
-                self._update_score()
-                self._snake.add_segment()
-                self._apple = self._create_apple()
-            self._gui.master.after(self._snake.speed, self._start_game)
-
-    def _create_apple(self):
-        """Creating new apple."""
-
-        apple_coord = self._random_coord()
-        while apple_coord in \
-                [coord.coord[0:2] for coord in self._snake.segments]:
-            apple_coord = self._random_coord()
+        self._started = time.monotonic()
+        self._scheduler.start()
+
+    def _step_period(self):
+        """Returns the period of the steps of the snake
+        in milliseconds.
+
+        """
+        return self._replay_period or self._engine.speed
+
+    def _frame_period(self):
+        """Returns the period of the frames in milliseconds."""
+
+        if self._turbo:
+            return Game._FRAME_PERIOD
+        return max(self._step_period(), Game._FRAME_PERIOD)
+
+    def _tick(self):
+        """Makes the steps of the game due in a frame and draws
+        the result once. Returns False when the game is over.
+
+        """
+        running = True
+        steps = 0
+        if self._turbo:
+            deadline = time.perf_counter() + Game._TURBO_BUDGET
+            while running and time.perf_counter() < deadline:
+                running = self._step()
+                steps += 1
         else:
-            return Apple(self._gui.c_game_main, apple_coord)
+            self._steps += self._frame_period() / self._step_period()
+            while running and self._steps >= 1:
+                self._steps -= 1
+                running = self._step()
+                steps += 1
+        ate = self._engine.score != self._drawn_score
+        if ate:
+            # The eaten apple is removed before the snake is drawn
+            # on its cell, otherwise the bitmap gets a hole there.
+            self._apple.release()
+        self._snake.sync(self._engine.body, steps)
+        if not running:
+            self._game_over()
+            return False
+        if ate:
+            self._drawn_score = self._engine.score
+            self._update_score()
+            self._apple = self._gui.create_apple(self._engine.apple)
+        return True
 
-    @staticmethod
-    def _random_coord():
-        """Random generation of apple coordinates"""
+    def _step(self):
+        """Makes one step of the snake.
+        Returns False when the game is over.
 
-        return list(
-            (random.randrange(0, GuiApp.GAME_AREA_SIZE['width'] - 19, 20),
-             random.randrange(0, GuiApp.GAME_AREA_SIZE['height'] - 19, 20))
-        )
+        """
+        if self._autopilot is not None:
+            direction = self._autopilot.next_direction()
+            if direction is not None:
+                self._engine.turn(direction)
+        elif self._replay is not None:
+            direction = self._replay.turns.get(self._engine.ticks + 1)
+            if direction is not None:
+                self._engine.turn(direction)
+        self._engine.step()
+        if self._recorder is not None:
+            self._recorder.record()
+        return not (self._engine.done or (
+            self._replay is not None and
+            self._engine.ticks >= self._replay.ticks
+        ))
+
+    def _load_replay(self):
+        """Puts the next replay on the game area, the replays
+        of another size than the game area are skipped.
+        Returns False and shows the menu if there are no more replays.
 
-    def _snake_crush(self):
-        """Checks snake crush."""
-
-        crush = False
-        head_coord, *body_coord = self._snake.segments
-        if head_coord.coord in [body.coord for body in body_coord]:
-            crush = True
-        elif [neg_coord for neg_coord in head_coord.coord if neg_coord < 0]:
-            crush = True
-        elif [over_coord for over_coord in head_coord.coord \
-              if over_coord > GuiApp.GAME_AREA_SIZE['width']]:
-            crush = True
-        return crush
-
-    def _update_top_score(self):
-        """Updates a top score on a label widget."""
-
-        self._gui.l_game_top['text'] = re.sub(
-            r'\d{1,2}$', str(self._top_score), self._gui.l_game_top['text']
-        )
+        """
+        self._replay = next((
+            replay for replay in self._replays
+            if (replay.width, replay.height) == tuple(self._gui.grid_size)
+        ), None)
+        if self._replay is None:
+            self._replays = None
+            self._gui.show_menu()
+            return False
+        self._seed = self._replay.seed
+        self._engine = self._replay.engine()
+        return True
+
+    def _change_direction(self, key):
+        """Queues the change of the direction of the snake."""
+
+        if key in SnakeEngine.DIRECTIONS:
+            self._engine.turn(key)
 
     def _update_score(self):
-        """Updates a score on a label widget."""
+        """Updates the score and the top score above the game area."""
 
-        self._gui.l_game_top['text'] = re.sub(
-            r'\d{1,2}', str(self._score), self._gui.l_game_top['text'], count=1
-        )
+        self._gui.show_status(self._engine.score, self._top_score)
 
     def _show_top_scores(self):
         """Opens the child of window with top players."""
 
-        self._gui.show_top_scores(self._score_db.get_scores())
-        if not self._score_db:
-            self._gui.btn_result_clear['state'] = DISABLED
-        else:
-            self._gui.btn_result_clear['command'] = self._clear_score_db
+        self._open_score_db()
+        self._history.compact(self._score_db)
+        self._gui.show_top_scores(
+            self._score_db.get_scores(),
+            self._clear_score_db if self._score_db else None
+        )
 
     def _show_entry_player(self):
         """Opens the child of window at the end of the game.
@@ -139,52 +259,70 @@ class Game(object):
 
         """
 
-        if self._score != 0:
-            self._gui.show_entry_player(self._score)
-            self._gui.btn_ok['command'] = self._check_player_name
-            self._gui.w_entry_player.protocol(
-                'WM_DELETE_WINDOW', self._close_entry_win
+        if (self._engine.score != 0 and not self._autopilot_mode and
+                self._replay is None):
+            self._gui.show_entry_player(
+                self._engine.score, self._check_player_name,
+                self._close_entry_win
             )
         else:
+            # Games without a name (the autopilot games too)
+            # are not moved to the high score table.
+            self._log_game('')
             self._renew_game()
 
     def _close_entry_win(self):
         """Closes the child window and initialize the new game."""
 
-        self._gui.w_entry_player.destroy()
+        self._gui.close_entry_player()
+        self._log_game('')
         self._renew_game()
 
     def _game_over(self):
         """Shows game over text on a label widget,
-        removes elements from the playing area.
+        schedules removal of elements from the playing area.
 
         """
-        self._gui.show_game_over()
-        time.sleep(3)
-        for snake_segment in self._snake.segments[::-1]:
-            snake_segment.__del__()
-            time.sleep(0.1)
-        self._apple.__del__()
-        time.sleep(1)
-        self._show_entry_player()
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+        self._duration = time.monotonic() - self._started
+        self._gui.show_game_over(self._engine.won)
+        count = -(-len(self._snake.segments) // Game._SEGMENT_STEPS)
+        self._gui.after(
+            Game._GAME_OVER_DELAY, self._remove_snake, count
+        )
+
+    def _remove_snake(self, count):
+        """Removes the snake from the tail, count segments per step.
+        A long snake is removed several segments per step,
+        so the animation never takes more than _SEGMENT_STEPS steps.
+
+        """
+        if self._snake.segments:
+            self._snake.remove_tail(count)
+            self._gui.after(
+                Game._SEGMENT_DELAY, self._remove_snake, count
+            )
+        else:
+            self._apple.release()
+            self._gui.after(
+                Game._ENTRY_DELAY, self._show_entry_player
+            )
 
     def _save_score(self):
         """It saves the scores of the player in a database."""
 
         self._player = self._player.capitalize()
-        if self._player in self._score_db:
-            old_score = self._score_db[self._player]
-            self._score_db[self._player] = \
-                self._score if self._score > old_score else old_score
-        else:
-            self._score_db[self._player] = self._score
-        self._gui.w_entry_player.destroy()
+        self._log_game(self._player)
+        self._top_score = max(self._top_score, self._engine.score)
+        self._gui.close_entry_player()
         self._renew_game()
 
     def _get_player_name(self):
         """Getting the player name."""
 
-        self._player = self._gui.player.get().strip()
+        self._player = self._gui.get_player().strip()
 
     def _check_player_name(self):
         """Checks player name."""
@@ -199,27 +337,69 @@ class Game(object):
     def _renew_game(self):
         """Initialize a new game."""
 
-        self.__init__(self._gui)
-        self._gui.l_game_top['text'] = 'Score: 0\t\tTopScore: 0'
-        self._update_top_score()
+        self._snake.clear()
+        self._apple.release()
+        self.__init__(self._gui, self._level)
         self._update_score()
-        self._gui.player = StringVar()
         self._gui.show_menu()
+        if self._autopilot_mode or self._replays is not None:
+            self._pre_start()
 
     def _close_root(self):
         """Actions at the closing of the root window."""
 
-        self._score_db.close()
-        self._gui.master.destroy()
+        self._scheduler.stop()
+        if self._recorder is not None:
+            self._recorder.close()
+        if self._frame_stats:
+            self._scheduler.dump(self._frame_stats)
+        try:
+            if self._score_db is not None:
+                self._history.compact(self._score_db)
+                self._history.close()
+                self._score_db.close()
+        finally:
+            # A failed write of the scores is reported,
+            # but does not keep the window open.
+            self._gui.destroy()
 
     def _clear_score_db(self):
         """Deletes all entries from the database."""
 
         self._score_db.clear_db()
-        self._score_db.close()
-        self._score_db = Game._load_score_db()
-        self._top_score = self._score_db.get_top_score()
-        self._gui.w_top_scores.destroy()
+        self._top_score = 0
+        self._gui.close_top_scores()
+
+    def _open_score_db(self):
+        """Opens the database with the results and the history
+        at the first call, compacts the history and reads the top score.
+
+        """
+        if self._score_db is None:
+            self._score_db = Game._load_score_db()
+            self._history = GameHistory(Game._HISTORY_PATH)
+            self._history.compact(self._score_db)
+            self._top_score = self._score_db.get_top_score()
+
+    def _log_game(self, player):
+        """Appends the finished game to the history, the history
+        is compacted into the database every _COMPACT_GAMES games
+        by the writer thread of the database.
+        Replays are not logged.
+
+        Argument player is the name of the player, empty
+        for a game without a name.
+
+        """
+        if self._replay is not None:
+            return
+        self._history.append(
+            player, self._engine.score, len(self._engine.body),
+            self._duration, self._seed
+        )
+        self._logged_games += 1
+        if self._logged_games % Game._COMPACT_GAMES == 0:
+            self._history.compact(self._score_db, wait=False)
 
     @classmethod
     def _load_score_db(cls):
@@ -227,4 +407,4 @@ class Game(object):
 
         if not os.path.exists(cls._SCORE_DB_PATH):
             os.makedirs(cls._SCORE_DB_PATH)
-        return ScoreDb(os.path.join(cls._SCORE_DB_PATH, GuiApp.TITLE))
+        return ScoreDb(os.path.join(cls._SCORE_DB_PATH, Renderer.TITLE))
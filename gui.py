@@ -2,42 +2,70 @@
 
 This module provides classes which allow the display, positioning
 and control of game objects.
-Classes: GuiApp, Segment, Apple, SnakeSegment, Snake.
+Classes: GuiApp, ItemPool, Segment, Apple, SnakeSegment, Snake,
+BitmapBoard, BitmapApple, BitmapSnake.
 
 """
 
 
-import tkinter.messagebox as msg_box
+import re
 
+from collections import deque
 from tkinter import *
 
+from renderer import Renderer
 
-__all__ = ['GuiApp', 'Snake', 'Apple']
+
+__all__ = ['GuiApp', 'Segment', 'Snake', 'Apple']
 __author__ = 'Artem Kustov'
 __email__ = 'artem.kustov@artcom-net.ru'
 __version__ = '1.0'
 
 
-class GuiApp(object):
+class GuiApp(Renderer):
     """Main GUI of game. This class provides methods for
     manage windows, frames and other widgets.
     The object of this class is controlled instance of the Game.
 
     """
-    TITLE = 'PySnake'
     GAME_AREA_SIZE = {'width': 500, 'height': 500}
+    CELL_SIZE = 20
+    MAX_GRID_SIZE = 1000
+    MAX_AREA_SIZE = 2000
     _BG = '#013106'
     _FG = '#56C12F'
+    _WALL = '#7A5A2E'
     _ACT_BG = '#56A32F'
     _FONT = 'Times 14 bold'
     _BUTTON_CONF = {'width': 12, 'bd': 4, 'bg': '#56C12F', 'fg': '#013106'}
 
-    def __init__(self, master):
+    def __init__(self, master, grid_size=Renderer.GRID_SIZE,
+                 cell_size=None,
+                 bitmap=False):
         """Initialize an instance.
 
-        Argument master is instance of the Tk().
+        Argument master is instance of the Tk(), grid_size is the
+        number of columns and rows of the game area, cell_size is the
+        size of a cell in pixels (by default fit_cell_size()). The game
+        area of the default size is drawn with canvas items on the
+        background image, other sizes (or bitmap=True) are drawn on one
+        bitmap, the BitmapBoard. Raises ValueError if a side of the game
+        area is larger than MAX_AREA_SIZE pixels.
 
         """
+        if cell_size is None:
+            cell_size = GuiApp.fit_cell_size(grid_size)
+        if max(grid_size) * cell_size > GuiApp.MAX_AREA_SIZE:
+            raise ValueError(
+                'the game area must be up to %d pixels'
+                % GuiApp.MAX_AREA_SIZE
+            )
+        self.grid_size = grid_size
+        self.cell_size = cell_size
+        self.bitmap = bitmap or (grid_size, cell_size) != (
+            GuiApp.GRID_SIZE, GuiApp.CELL_SIZE
+        )
+        self._images = {}
         # Configuring the main window.
         self.master = master
         self.master.title(GuiApp.TITLE)
@@ -46,18 +74,14 @@ class GuiApp(object):
         self.master.option_add('*Background', GuiApp._BG)
         self.master.option_add('*Activebackground', GuiApp._ACT_BG)
         self.master.option_add('*Foreground', GuiApp._FG)
-        # Load app images.
         self.master.iconbitmap('images/icon.ico')
-        self._img_game_area = PhotoImage(file='images/game_area.gif')
-        self._img_menu_title = PhotoImage(file='images/menu_title.png')
-        self._img_menu_snake = PhotoImage(file='images/menu_snake.png')
         # Configuring menu frame.
         self.f_menu = Frame(self.master, bd=50)
         self.l_img_menu_title = Label(
-            self.f_menu, image=self._img_menu_title, bd=0
+            self.f_menu, image=self._image('images/menu_title.png'), bd=0
         )
         self.l_img_menu_snake = Label(
-            self.f_menu, image=self._img_menu_snake, bd=0
+            self.f_menu, image=self._image('images/menu_snake.png'), bd=0
         )
         self.btn_start = Button(
             self.f_menu, text='START GAME',
@@ -67,27 +91,16 @@ class GuiApp(object):
             self.f_menu, text='HIGH SCORE',
             **GuiApp._BUTTON_CONF
         )
-        # Configuring game frames.
-        self.f_game_top = Frame(self.master, bd=10, relief=RIDGE)
-        self.l_game_top = Label(
-            self.f_game_top, text='Score: 0\t\tTopScore: 0'
-        )
-        self.f_game_main = Frame(
-            self.master,
-            bd=18,
-            bg='#013106',
-            relief=RIDGE
-        )
-        self.c_game_main = Canvas(
-            self.f_game_main,
-            width=GuiApp.GAME_AREA_SIZE['width'],
-            height=GuiApp.GAME_AREA_SIZE['height']
-        )
-        self.c_game_main.create_image(
-            GuiApp.GAME_AREA_SIZE['width'] / 2,
-            GuiApp.GAME_AREA_SIZE['height'] / 2,
-            image=self._img_game_area
-        )
+        # Initialize game frames, they are built by the first show_game.
+        self.f_game_top = None
+        self.l_game_top = None
+        self.f_game_main = None
+        self.c_game_main = None
+        self.item_pool = None
+        self.board = None
+        self._background = None
+        self._walls = ()
+        self._walls_image = None
         # Initialize child window with top of scores.
         self.w_top_scores = None
         self.f_top_scores = None
@@ -103,34 +116,86 @@ class GuiApp(object):
         self.e_entry_player = None
         self.btn_ok = None
         self.player = StringVar()
+        self._key_callback = None
         # Placing widgets.
         self.l_img_menu_title.grid(row=0, column=0, columnspan=2)
         self.l_img_menu_snake.grid(row=1, column=0, columnspan=2, pady=50)
         self.btn_start.grid(row=2, column=0, sticky=E, padx=(0, 30))
         self.btn_score.grid(row=2, column=1, sticky=W)
-        self.l_game_top.pack()
-        self.c_game_main.pack()
         # Configuring widgets.
         self._align_window(self.master)
 
+    def bind(self, start, scores, close):
+        """Sets the commands of the menu buttons
+        and of the closing of the main window.
+
+        """
+        self.btn_start['command'] = start
+        self.btn_score['command'] = scores
+        self.master.protocol('WM_DELETE_WINDOW', close)
+
+    def bind_keys(self, callback):
+        """Calls callback(key) for the keys pressed on the game area."""
+
+        self._key_callback = callback
+
+    def after(self, delay, callback, *args):
+        """Calls callback(*args) after delay milliseconds."""
+
+        return self.master.after(delay, callback, *args)
+
+    def after_cancel(self, after_id):
+        """Cancels a call scheduled by after()."""
+
+        self.master.after_cancel(after_id)
+
+    def create_snake(self, body):
+        """Returns the snake drawn on the game area."""
+
+        if self.board is not None:
+            return BitmapSnake(self.board, body)
+        return Snake(self.item_pool, body)
+
+    def create_apple(self, cell):
+        """Returns the apple drawn on the game area."""
+
+        if self.board is not None:
+            return BitmapApple(self.board, cell)
+        return Apple(self.item_pool, cell)
+
+    def show_walls(self, cells):
+        """Draws the walls into the background image of the game area
+        (the bitmap of the BitmapBoard), not as canvas items.
+
+        """
+        self._walls = tuple(cells)
+        if self.c_game_main is not None:
+            self._draw_walls()
+
     def show_menu(self):
         """Shows main menu."""
 
-        self.f_game_top.pack_forget()
-        self.f_game_main.pack_forget()
+        if self.c_game_main is not None:
+            self.f_game_top.pack_forget()
+            self.f_game_main.pack_forget()
         self.f_menu.pack()
 
     def show_game(self):
-        """Shows game area."""
+        """Shows game area, builds it at the first call."""
 
+        if self.c_game_main is None:
+            self._build_game_area()
         self.f_menu.pack_forget()
         self.f_game_top.pack(fill=X)
         self.f_game_main.pack()
         self.c_game_main.focus_set()
 
-    def show_top_scores(self, scores):
-        """Opens the child of window with top players."""
+    def show_top_scores(self, scores, clear=None):
+        """Opens the child of window with top players.
+        Argument clear is the command of the clear button,
+        None disables the button.
 
+        """
         self.w_top_scores = Toplevel(self.master)
         self.w_top_scores.resizable(0, 0)
         self.w_top_scores.transient(self.master)
@@ -140,12 +205,14 @@ class GuiApp(object):
         self.btn_result_close = Button(
             self.f_top_scores,
             text='CLOSE',
-            command=self._close_top_scores,
+            command=self.close_top_scores,
             **GuiApp._BUTTON_CONF
         )
         self.btn_result_clear = Button(
             self.f_top_scores,
             text='CLEAR',
+            command=clear,
+            state=DISABLED if clear is None else NORMAL,
             **GuiApp._BUTTON_CONF
         )
         self.f_top_scores.pack()
@@ -173,9 +240,11 @@ class GuiApp(object):
         self.f_top_scores.focus_set()
         self._align_window(self.w_top_scores)
 
-    def show_entry_player(self, score):
+    def show_entry_player(self, score, ok, close):
         """Opens the child of window at the end of the game.
         Shows score and entry for input a player name.
+        Argument ok is the command of the OK button, close
+        is called at the closing of the window.
 
         """
         self.w_entry_player = Toplevel(self.master)
@@ -197,6 +266,7 @@ class GuiApp(object):
         self.btn_ok = Button(
             self.f_entry_player,
             text='OK',
+            command=ok,
             state=DISABLED,
             **GuiApp._BUTTON_CONF
         )
@@ -208,18 +278,133 @@ class GuiApp(object):
         self.e_entry_player.focus_set()
         self._align_window(self.w_entry_player)
         self.player.trace('w', lambda *event: self._switch_btn_ok())
+        self.w_entry_player.protocol('WM_DELETE_WINDOW', close)
+
+    def get_player(self):
+        """Returns the entered player name."""
+
+        return self.player.get()
+
+    def close_entry_player(self):
+        """Destroys the child window, clears the player name."""
+
+        self.w_entry_player.destroy()
+        self.player = StringVar()
 
-    def show_game_over(self):
+    def show_status(self, score, top_score):
         """Change top label text."""
 
-        self.l_game_top['text'] = 'Game Over'
-        self.f_game_top.update()
+        self.l_game_top['text'] = 'Score: %s\t\tTopScore: %s' % (
+            score, top_score
+        )
+
+    def show_game_over(self, won=False):
+        """Change top label text."""
+
+        self.l_game_top['text'] = 'You Win' if won else 'Game Over'
+
+    def show_message(self, text):
+        """Change top label text."""
+
+        self.l_game_top['text'] = text
+
+    def _build_game_area(self):
+        """Creates the game frames and the canvas of the game area."""
+
+        area_width = self.grid_size[0] * self.cell_size
+        area_height = self.grid_size[1] * self.cell_size
+        self.f_game_top = Frame(self.master, bd=10, relief=RIDGE)
+        self.l_game_top = Label(
+            self.f_game_top, text='Score: 0\t\tTopScore: 0'
+        )
+        self.f_game_main = Frame(
+            self.master,
+            bd=18,
+            bg='#013106',
+            relief=RIDGE
+        )
+        self.c_game_main = Canvas(
+            self.f_game_main,
+            width=area_width,
+            height=area_height,
+            highlightthickness=0
+        )
+        self.c_game_main.bind('<KeyPress>', self._key_press)
+        self.item_pool = ItemPool(self.c_game_main)
+        if self.bitmap:
+            self.board = BitmapBoard(
+                self.c_game_main, self.grid_size, self.cell_size, GuiApp._BG
+            )
+        else:
+            self._background = self.c_game_main.create_image(
+                area_width / 2,
+                area_height / 2,
+                image=self._image('images/game_area.gif')
+            )
+        if self._walls:
+            self._draw_walls()
+        self.l_game_top.pack()
+        self.c_game_main.pack()
+
+    def _draw_walls(self):
+        """Puts the walls into the background image."""
+
+        if self.board is not None:
+            self.board.set_walls(self._walls, GuiApp._WALL)
+            return
+        # The walls are put into a copy of the background image,
+        # which is centered on the canvas and may be larger.
+        image = self._image('images/game_area.gif').copy()
+        left = (image.width() - self.grid_size[0] * self.cell_size) // 2
+        top = (image.height() - self.grid_size[1] * self.cell_size) // 2
+        for columns, row in cell_runs(self._walls):
+            image.put(GuiApp._WALL, to=(
+                left + columns[0] * self.cell_size,
+                top + row * self.cell_size,
+                left + columns[1] * self.cell_size,
+                top + (row + 1) * self.cell_size
+            ))
+        self._walls_image = image
+        self.c_game_main.itemconfigure(self._background, image=image)
+
+    @staticmethod
+    def fit_cell_size(grid_size):
+        """Returns CELL_SIZE, or less for a large grid_size,
+        so the game area is not larger than MAX_AREA_SIZE pixels.
 
-    def _close_top_scores(self):
+        """
+        return max(min(
+            GuiApp.CELL_SIZE, GuiApp.MAX_AREA_SIZE // max(grid_size)
+        ), 1)
+
+    def _image(self, path):
+        """Returns the image of the file, decoded at the first call."""
+
+        if path not in self._images:
+            self._images[path] = PhotoImage(file=path)
+        return self._images[path]
+
+    def close_top_scores(self):
         """Destroys a child window."""
 
         self.w_top_scores.destroy()
 
+    def mainloop(self):
+        """Runs the event loop of Tk."""
+
+        self.master.mainloop()
+
+    def destroy(self):
+        """Destroys the main window."""
+
+        self.master.destroy()
+
+    def _key_press(self, event):
+        """Passes the pressed key to the callback of bind_keys()."""
+
+        if self._key_callback is not None:
+            self._key_callback(event.keysym)
+
     def _switch_btn_ok(self):
         """Change state of the button."""
 
@@ -232,6 +417,7 @@ class GuiApp(object):
     def show_player_error():
         """Shows a message with error."""
 
+        import tkinter.messagebox as msg_box
         msg_box.showerror('Error', 'Player name must contain letter(s) \
                                    and not exceed 15 characters!')
 
@@ -250,144 +436,347 @@ class GuiApp(object):
         win.geometry('+{0:.0f}+{1:.0f}'.format(x, y))
 
 
+class ItemPool(object):
+    """Pool of the rectangles of a canvas object.
+    Released rectangles are hidden and given out again instead of
+    creating new ones, so games and ticks do not create and delete
+    canvas items.
+
+    """
+
+    def __init__(self, canvas_obj):
+        """Initialize an instance.
+
+        Argument canvas_obj is instance of the Canvas class.
+
+        """
+        self.canvas_obj = canvas_obj
+        self._free = []
+
+    def acquire(self, coord, color, tag):
+        """Returns a visible rectangle with the coordinates,
+        color and tag.
+
+        """
+        if not self._free:
+            return self.canvas_obj.create_rectangle(
+                *coord, fill=color, tags=tag
+            )
+        item = self._free.pop()
+        self.canvas_obj.coords(item, coord)
+        self.canvas_obj.itemconfigure(
+            item, fill=color, tags=tag, state=NORMAL
+        )
+        return item
+
+    def release(self, item):
+        """Hides the rectangle and returns it to the pool."""
+
+        self.canvas_obj.itemconfigure(item, state=HIDDEN)
+        self._free.append(item)
+
+    def release_tag(self, tag, items):
+        """Hides all rectangles with the tag at once and returns
+        the items (all of them must have the tag) to the pool.
+
+        """
+        self.canvas_obj.itemconfigure(tag, state=HIDDEN)
+        self._free.extend(items)
+
+
 class Segment(object):
     """The base class inherits Apple and SnakeSegment."""
 
     SIZE = 20
 
-    def __init__(self, canvas_obj, coord, color=''):
+    def __init__(self, pool, cell, color='', tag=''):
         """Initialize an instance.
 
-        Argument canvas_obj is instance of the Canvas class,
-        coord is coordinates of the view: (x, y, x2, y2),
-        color determined in classes successors.
+        Argument pool is instance of the ItemPool class,
+        cell is a position on the game area: (column, row),
+        color and tag determined in classes successors.
 
         """
-        self.canvas_obj = canvas_obj
-        self.segment = self.canvas_obj.create_rectangle(
-            coord[0],
-            coord[1],
-            coord[0] + Segment.SIZE,
-            coord[1] + Segment.SIZE, fill=color
+        self.pool = pool
+        self.segment = self.pool.acquire(
+            Segment.cell_coord(cell), color, tag
         )
 
+    @staticmethod
+    def cell_coord(cell):
+        """Returns coordinates of the view of the cell: (x, y, x2, y2)."""
+
+        x, y = cell[0] * Segment.SIZE, cell[1] * Segment.SIZE
+        return x, y, x + Segment.SIZE, y + Segment.SIZE
+
     @property
     def coord(self):
         """Getter coordinates of the segment."""
 
-        return self.canvas_obj.coords(self.segment)
+        return self.pool.canvas_obj.coords(self.segment)
 
     @coord.setter
     def coord(self, coord):
         """Setter coordinates of the segment."""
 
-        self.canvas_obj.coords(self.segment, coord)
+        self.pool.canvas_obj.coords(self.segment, coord)
 
-    def __del__(self):
-        """Removes segment from the canvas object."""
+    def release(self):
+        """Returns segment to the pool, it disappears from the canvas."""
 
-        try:
-            self.canvas_obj.delete(self.segment)
-            self.canvas_obj.update()
-        except TclError:
-            pass
+        if self.segment is not None:
+            self.pool.release(self.segment)
+            self.segment = None
 
 
 class Apple(Segment):
     """Subclass of the Segment."""
 
     COLOR = 'red'
+    TAG = 'apple'
 
-    def __init__(self, canvas_obj, coord):
-        super().__init__(canvas_obj, coord, color=Apple.COLOR)
+    def __init__(self, pool, cell):
+        super().__init__(pool, cell, color=Apple.COLOR, tag=Apple.TAG)
 
 
 class SnakeSegment(Segment):
     """Subclass of the Segment."""
 
     COLOR = '#56C12F'
+    TAG = 'snake'
 
-    def __init__(self, canvas_obj, coord):
-        super().__init__(canvas_obj, coord, color=SnakeSegment.COLOR)
+    def __init__(self, pool, cell):
+        super().__init__(
+            pool, cell, color=SnakeSegment.COLOR, tag=SnakeSegment.TAG
+        )
 
 
 class Snake(object):
-    """This class defines the properties and methods of the snake.
-    An object of class snake consists of the SnakeSegment instances.
+    """This class draws the snake.
+    An object of class snake consists of the SnakeSegment instances,
+    their positions are taken from the body of the SnakeEngine.
     The object of this class is controlled instance of the Game.
 
     """
 
-    _SNAKE_LEN = 3
-    _HEAD_POSITION = (60, 60)
-    _DIRECTIONS = {
-        'Left': (-1, 0),
-        'Right': (1, 0),
-        'Up': (0, -1),
-        'Down': (0, 1)
-    }
-    _SPEED = 400
+    def __init__(self, pool, body):
+        """Initialize an instance.
 
-    def __init__(self, canvas_obj):
+        Argument pool is instance of the ItemPool class,
+        body is a sequence of cells of the snake, the head is the first.
+
+        """
+        self.pool = pool
+        self.segments = deque(SnakeSegment(self.pool, cell) for cell in body)
+
+    def sync(self, body, steps):
+        """Moves the snake to the body after the number of steps
+        made since the last drawing, the cells passed by the head
+        between the drawings are not drawn.
+
+        """
+        length = len(body)
+        for index in range(min(steps, length) - 1, -1, -1):
+            self._move_head(body[index], length)
+        while len(self.segments) > len(body):
+            self.segments.pop().release()
+
+    def _move_head(self, head, length):
+        """Puts a segment to the head, the tail segment is moved
+        while the snake has length segments.
+
+        """
+        if len(self.segments) < length:
+            segment = SnakeSegment(self.pool, head)
+        else:
+            segment = self.segments.pop()
+            segment.coord = Segment.cell_coord(head)
+        self.segments.appendleft(segment)
+
+    def remove_tail(self, count):
+        """Removes up to count segments from the tail."""
+
+        for _ in range(min(count, len(self.segments))):
+            self.segments.pop().release()
+
+    def clear(self):
+        """Removes all segments from the canvas object at once."""
+
+        self.pool.release_tag(
+            SnakeSegment.TAG,
+            [segment.segment for segment in self.segments]
+        )
+        for segment in self.segments:
+            segment.segment = None
+        self.segments.clear()
+
+
+class BitmapBoard(object):
+    """Game area drawn as one PhotoImage, every cell is a square
+    of pixels. Changed cells are collected and put into the image
+    at once when Tk is idle, cells of one color that follow each other
+    in a row are put as one rectangle.
+
+    """
+
+    def __init__(self, canvas_obj, grid_size, cell_size, color):
         """Initialize an instance.
 
-        Argument canvas_obj is instance of the Canvas class.
+        Argument canvas_obj is instance of the Canvas class,
+        grid_size is the number of columns and rows, cell_size
+        is the size of a cell in pixels, color is the background.
 
         """
         self.canvas_obj = canvas_obj
-        segments_coord = [Snake._HEAD_POSITION, ]
-        for segment in range(Snake._SNAKE_LEN - 1):
-            segments_coord.append(
-                (Snake._HEAD_POSITION[0] - SnakeSegment.SIZE * (segment + 1),
-                 Snake._HEAD_POSITION[1])
-            )
-        self.segments = [
-            SnakeSegment(self.canvas_obj, coord) for coord in segments_coord
-        ]
-        self.direction = Snake._DIRECTIONS['Right']
-        self.speed = Snake._SPEED
-
-    def move(self):
-        """Moves the snake."""
-
-        prev_coord = [segment.coord for segment in self.segments]
-        for segment in self.segments[1:]:
-            index = self.segments.index(segment)
-            coord = prev_coord[index - 1]
-            segment.coord = coord
-        head_coord = self.segments[0].coord
-        self.segments[0].coord = (
-            head_coord[0] + self.direction[0] * SnakeSegment.SIZE,
-            head_coord[1] + self.direction[1] * SnakeSegment.SIZE,
-            head_coord[2] + self.direction[0] * SnakeSegment.SIZE,
-            head_coord[3] + self.direction[1] * SnakeSegment.SIZE
+        self.grid_size = grid_size
+        self.cell_size = cell_size
+        self.color = color
+        self.image = PhotoImage(
+            width=grid_size[0] * cell_size, height=grid_size[1] * cell_size
         )
+        self.canvas_obj.create_image(0, 0, anchor=NW, image=self.image)
+        self._dirty = {}
+        self._flush_id = None
+        self._walls = ()
+        self._wall_color = None
+        self.clear()
+
+    def fill(self, cell, color=None):
+        """Paints the cell, by default with the background color."""
+
+        if 0 <= cell[0] < self.grid_size[0] and \
+                0 <= cell[1] < self.grid_size[1]:
+            self._dirty[cell] = color or self.color
+            if self._flush_id is None:
+                self._flush_id = self.canvas_obj.after_idle(self.flush)
+
+    def set_walls(self, cells, color):
+        """Paints the walls, they stay on the background
+        after clear().
 
-    def change_direction(self, event):
-        """Changes the direction of the snake."""
+        """
+        self._walls = tuple(cell_runs(cells))
+        self._wall_color = color
+        self.clear()
 
-        if event.keysym in Snake._DIRECTIONS:
-            self.direction = Snake._DIRECTIONS[event.keysym]
+    def clear(self):
+        """Paints the whole game area with the background color
+        and the walls.
+
+        """
+        self._dirty.clear()
+        self.image.put(
+            self.color, to=(0, 0, self.image.width(), self.image.height())
+        )
+        for columns, row in self._walls:
+            self._put(columns, row, self._wall_color)
+
+    def flush(self):
+        """Puts the changed cells into the image."""
+
+        self._flush_id = None
+        run = None
+        for (x, y), color in sorted(
+                self._dirty.items(), key=lambda item: item[0][::-1]):
+            if run is not None and run[1:] == [y, color] and x == run[0][1]:
+                run[0][1] = x + 1
+                continue
+            if run is not None:
+                self._put(*run)
+            run = [[x, x + 1], y, color]
+        if run is not None:
+            self._put(*run)
+        self._dirty.clear()
+
+    def _put(self, columns, row, color):
+        """Puts a rectangle of the cells of one row."""
+
+        size = self.cell_size
+        self.image.put(color, to=(
+            columns[0] * size, row * size, columns[1] * size, (row + 1) * size
+        ))
+
+
+class BitmapApple(object):
+    """Apple drawn on the BitmapBoard."""
+
+    def __init__(self, board, cell):
+        """Initialize an instance.
 
-    def change_speed(self):
-        """Changes the speed of the snake."""
+        Argument board is instance of the BitmapBoard,
+        cell is a position on the game area: (column, row).
 
-        if self.speed > 150:
-            self.speed -= 10
-        elif 80 < self.speed <= 150:
-            self.speed -= 5
-        elif 20 < self.speed <= 80:
-            self.speed -= 2
-        else:
-            self.speed -= 1
+        """
+        self.board = board
+        self.cell = cell
+        self.board.fill(cell, Apple.COLOR)
 
-    def add_segment(self):
-        """Adds to the tail segment of a snake."""
+    def release(self):
+        """Removes apple from the board."""
 
-        tail_coord = self.segments[-1].coord
-        segment_coord = (
-            tail_coord[2] - SnakeSegment.SIZE,
-            tail_coord[3] - SnakeSegment.SIZE
-        )
-        self.segments.append(SnakeSegment(self.canvas_obj, segment_coord))
-        self.change_speed()
+        if self.cell is not None:
+            self.board.fill(self.cell)
+            self.cell = None
+
+
+class BitmapSnake(object):
+    """Snake drawn on the BitmapBoard.
+    The segments are the cells of the snake, the head is the first.
+
+    """
+
+    def __init__(self, board, body):
+        """Initialize an instance.
+
+        Argument board is instance of the BitmapBoard,
+        body is a sequence of cells of the snake, the head is the first.
+
+        """
+        self.board = board
+        self.segments = deque(body)
+        for cell in self.segments:
+            self.board.fill(cell, SnakeSegment.COLOR)
+
+    def sync(self, body, steps):
+        """Moves the snake to the body after the number of steps
+        made since the last drawing.
+
+        """
+        steps = min(steps, len(body))
+        # The tail is cleared first: the head may have passed
+        # the cells of the old tail since the last drawing.
+        while len(self.segments) > len(body) - steps:
+            self.board.fill(self.segments.pop())
+        for index in range(steps - 1, -1, -1):
+            cell = body[index]
+            self.segments.appendleft(cell)
+            self.board.fill(cell, SnakeSegment.COLOR)
+
+    def remove_tail(self, count):
+        """Removes up to count segments from the tail."""
+
+        for _ in range(min(count, len(self.segments))):
+            self.board.fill(self.segments.pop())
+
+    def clear(self):
+        """Removes all segments from the board at once."""
+
+        self.board.clear()
+        self.segments.clear()
+
+
+def cell_runs(cells):
+    """Yields the cells as pairs ([first column, last column + 1], row)
+    of the cells that follow each other in a row.
+
+    """
+    run = None
+    for x, y in sorted(cells, key=lambda cell: cell[::-1]):
+        if run is not None and run[1] == y and run[0][1] == x:
+            run[0][1] = x + 1
+            continue
+        if run is not None:
+            yield run
+        run = ([x, x + 1], y)
+    if run is not None:
+        yield run
@@ -0,0 +1,214 @@
+"""GameHistory class for PySnake game.
+
+This class keeps every finished game in an append-only log of
+fixed-size records, so the log is read through mmap without loading
+it and a record is never rewritten. The leaderboard (ScoreDb) is made
+from the log by compaction: the best scores of the games appended
+since the previous compaction are added in one transaction, which may
+be left to the writer thread of the ScoreDb.
+The statistics are computed from generators of records, in memory
+proportional to the number of players, not to the number of games.
+
+File format: a header struct '<4sI' (MAGIC, VERSION) and records
+struct '<d32sIIIQ' (time, player in UTF-8, score, length of the snake,
+duration in milliseconds, seed). The file with the extension
+'.offset' keeps the end of the compacted records.
+
+"""
+
+
+import mmap
+import os
+import struct
+import time
+
+from collections import namedtuple
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+MAGIC = b'PSNH'
+VERSION = 1
+_HEADER = struct.Struct('<4sI')
+_RECORD = struct.Struct('<d32sIIIQ')
+
+GameRecord = namedtuple(
+    'GameRecord', 'time player score length duration seed'
+)
+
+
+class HistoryError(Exception):
+    """Raised when a history file is damaged."""
+
+
+class GameHistory(object):
+    """Append-only log of the finished games.
+    The object of this class is controlled instance of the Game.
+
+    """
+
+    OFFSET_EXTENSION = '.offset'
+
+    def __init__(self, path):
+        """Initialize an instance.
+
+        Argument path is a path of the log file, it is created
+        if it does not exist.
+
+        """
+        self.path = path
+        self._file = open(path, 'ab')
+        if not self._file.tell():
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+            self._file.flush()
+
+    def append(self, player, score, length, duration, seed):
+        """Appends a finished game to the log.
+
+        Argument player is the name of the player, score and length
+        are the score and the length of the snake at the end,
+        duration is the time of the game in seconds, seed is the
+        seed of the SnakeEngine.
+
+        """
+        # The name is cut on a character boundary to fit the record.
+        name = player.encode()[:32].decode(errors='ignore').encode()
+        self._file.write(_RECORD.pack(
+            time.time(), name, score, length, int(duration * 1000), seed
+        ))
+        self._file.flush()
+
+    def records(self, start=_HEADER.size):
+        """Yields the records (GameRecord) from the byte offset start."""
+
+        for _, record in self._scan(start):
+            yield record
+
+    def compact(self, score_db, wait=True):
+        """Adds the best scores of the games appended since
+        the previous compaction to the score_db (ScoreDb)
+        in one transaction. Returns the number of the games.
+
+        If wait is False the scores are queued to the writer thread
+        of the score_db, and the compaction is saved after the commit.
+        Otherwise the queued compactions are finished first, so their
+        offsets are not written concurrently or read before written.
+
+        """
+        if wait:
+            score_db.flush()
+        start = self._read_offset()
+        best = {}
+        games = 0
+        end = start
+        for end, record in self._scan(start):
+            games += 1
+            if record.player and record.score > best.get(record.player, -1):
+                best[record.player] = record.score
+        results = sorted(best.items())
+        if wait:
+            if results:
+                score_db.add_scores(results)
+            if end != start:
+                self._write_offset(end)
+        elif end != start:
+            score_db.queue_scores(results, lambda: self._write_offset(end))
+        return games
+
+    def close(self):
+        """Closes the log."""
+
+        self._file.close()
+
+    def _scan(self, start):
+        """Yields pairs (end offset of the record, record)
+        of the complete records from the byte offset start.
+
+        """
+        with open(self.path, 'rb') as log_file:
+            with mmap.mmap(log_file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as data:
+                magic, version = _HEADER.unpack_from(data)
+                if magic != MAGIC or version != VERSION:
+                    raise HistoryError('bad header of %s' % self.path)
+                size = _RECORD.size
+                for offset in range(start, len(data) - size + 1, size):
+                    (moment, player, score, length, duration,
+                     seed) = _RECORD.unpack_from(data, offset)
+                    yield offset + size, GameRecord(
+                        moment, player.rstrip(b'\0').decode(), score,
+                        length, duration / 1000, seed
+                    )
+
+    def _read_offset(self):
+        """Returns the end of the compacted records."""
+
+        try:
+            with open(self.path + GameHistory.OFFSET_EXTENSION) as offset:
+                return int(offset.read())
+        except (OSError, ValueError):
+            return _HEADER.size
+
+    def _write_offset(self, end):
+        """Saves the end of the compacted records."""
+
+        path = self.path + GameHistory.OFFSET_EXTENSION
+        with open(path + '.tmp', 'w') as offset:
+            offset.write(str(end))
+        os.replace(path + '.tmp', path)
+
+
+def select(records, player=None, since=None, min_score=None):
+    """Yields the records of the player, finished after
+    the time since and with the score not less than min_score.
+
+    """
+    for record in records:
+        if player is not None and record.player != player:
+            continue
+        if since is not None and record.time < since:
+            continue
+        if min_score is not None and record.score < min_score:
+            continue
+        yield record
+
+
+def player_averages(records):
+    """Returns a dict of tuples (games, mean score, mean duration)
+    keyed by player.
+
+    """
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record.player, [0, 0, 0.0])
+        total[0] += 1
+        total[1] += record.score
+        total[2] += record.duration
+    return {
+        player: (games, score / games, duration / games)
+        for player, (games, score, duration) in sorted(totals.items())
+    }
+
+
+def score_distribution(records, bucket=1):
+    """Returns a dict of the numbers of the games keyed
+    by the lower bound of the score bucket of size bucket.
+
+    """
+    counts = {}
+    for record in records:
+        low = record.score // bucket * bucket
+        counts[low] = counts.get(low, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def running_mean(records):
+    """Yields pairs (record, mean score of the games so far)."""
+
+    total = 0
+    for games, record in enumerate(records, 1):
+        total += record.score
+        yield record, total / games
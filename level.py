@@ -0,0 +1,81 @@
+"""Level class for PySnake game.
+
+This class is a map of the walls of the game area. A level is a text
+file (images/*.txt): every line is a row of cells, '#' is a wall,
+any other character is a free cell, the longest line sets the width.
+The map is compiled once at load time into the occupancy grid
+(the collision bitmap) and the free cells of the SnakeEngine, so the
+walls cost nothing per tick: the crash check and the choice of the
+apple cell are the same as on an empty game area.
+
+"""
+
+
+from engine import FreeCells, SnakeEngine
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+WALL = 2
+
+
+class LevelError(Exception):
+    """Raised when a level file is wrong."""
+
+
+class Level(object):
+    """Walls of the game area compiled for the SnakeEngine."""
+
+    WALL_CHAR = '#'
+    MIN_SIZE = 5
+
+    def __init__(self, rows):
+        """Initialize an instance.
+
+        Argument rows is a sequence of strings, a row of cells each.
+        Raises LevelError if the level is smaller than MIN_SIZE
+        or the walls cover the start of the snake.
+
+        """
+        self.width = max((len(row) for row in rows), default=0)
+        self.height = len(rows)
+        if min(self.width, self.height) < Level.MIN_SIZE:
+            raise LevelError(
+                'a level must have at least %d rows and columns'
+                % Level.MIN_SIZE
+            )
+        self.walls = tuple(
+            (x, y)
+            for y, row in enumerate(rows)
+            for x, char in enumerate(row)
+            if char == Level.WALL_CHAR
+        )
+        self.grid = bytearray(self.width * self.height)
+        self.free = FreeCells(self.width * self.height)
+        for x, y in self.walls:
+            index = y * self.width + x
+            self.grid[index] = WALL
+            self.free.remove(index)
+        head_x, head_y = SnakeEngine.HEAD_POSITION
+        for x in range(head_x - SnakeEngine.SNAKE_LEN + 1, head_x + 2):
+            if self.grid[head_y * self.width + x]:
+                raise LevelError('the walls cover the start of the snake')
+
+    @property
+    def size(self):
+        """Returns the number of columns and rows."""
+
+        return self.width, self.height
+
+    @classmethod
+    def load(cls, path):
+        """Reads the level from the text file."""
+
+        with open(path) as level_file:
+            rows = level_file.read().splitlines()
+        while rows and not rows[-1].strip():
+            rows.pop()
+        return cls(rows)
@@ -4,10 +4,19 @@ PySnake a simple snake game with GUI and the feature of saving results.
 
 """
 
+import argparse
+import itertools
+import sys
+import time
+
 from tkinter import Tk
 
+from engine import parse_size
 from game import Game
 from gui import GuiApp
+from level import Level, LevelError
+from replay import Replay
+from scheduler import TickScheduler
 
 
 __author__ = 'Artem Kustov'
@@ -15,9 +24,211 @@ __email__ = 'artem.kustov@artcom-net.ru'
 __version__ = '1.0'
 
 
+def grid_size(value):
+    """Converts the argument COLUMNSxROWS to a tuple."""
+
+    try:
+        return parse_size(value, GuiApp.MAX_GRID_SIZE)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def address(value):
+    """Converts the argument [HOST:]PORT to a tuple."""
+
+    host, _, port = value.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected [HOST:]PORT')
+
+
+def report_startup(stages):
+    """Prints the time from the start to every stage in milliseconds.
+
+    Argument stages is a list of pairs (name, time.perf_counter()),
+    the first pair is the start.
+
+    """
+    start = stages[0][1]
+    for name, moment in stages[1:]:
+        print('%-12s %8.1f ms' % (name, (moment - start) * 1000),
+              file=sys.stderr)
+
+
+def parse_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description=GuiApp.TITLE)
+    parser.add_argument(
+        '--grid', metavar='COLUMNSxROWS', type=grid_size,
+        default=GuiApp.GRID_SIZE,
+        help='size of the game area in cells (default: 25x25)'
+    )
+    parser.add_argument(
+        '--cell-size', metavar='PX', type=int,
+        help='size of a cell in pixels (default: 20, less for grids '
+             'larger than %d pixels)' % GuiApp.MAX_AREA_SIZE
+    )
+    parser.add_argument(
+        '--bitmap', action='store_true',
+        help='draw the game area as one bitmap (always used for '
+             'non-default grid and cell sizes)'
+    )
+    parser.add_argument(
+        '--catch-up', action='store_const', dest='tick_mode',
+        const=TickScheduler.CATCH_UP, default=TickScheduler.SKIP,
+        help='run late ticks at once instead of skipping them'
+    )
+    parser.add_argument(
+        '--frame-stats', metavar='PATH',
+        help='write tick latency and jitter histograms to PATH on exit'
+    )
+    parser.add_argument(
+        '--autopilot', action='store_true',
+        help='let the computer play the games one after another'
+    )
+    parser.add_argument(
+        '--replay', metavar='PATH',
+        help='show the games recorded in the replay file PATH '
+             '(the first game sets the size of the game area)'
+    )
+    parser.add_argument(
+        '--replay-period', metavar='MS', type=int,
+        help='tick period of the replays (default: speed of the snake)'
+    )
+    parser.add_argument(
+        '--level', metavar='PATH',
+        help='play on the walls of the level file PATH '
+             '(sets the size of the game area)'
+    )
+    parser.add_argument(
+        '--turbo', action='store_true',
+        help='advance the game as fast as possible, drawing about '
+             '60 frames per second'
+    )
+    parser.add_argument(
+        '--metrics', metavar='PATH',
+        help='measure the hot paths and write the metrics to PATH on exit '
+             '(Prometheus text format for .prom, otherwise JSON)'
+    )
+    parser.add_argument(
+        '--profile', metavar='PATH',
+        help='run under cProfile and write the stats to PATH on exit'
+    )
+    parser.add_argument(
+        '--curses', action='store_true',
+        help='play in the terminal instead of a window'
+    )
+    parser.add_argument(
+        '--connect', metavar='[HOST:]PORT', type=address,
+        help='play on the multiplayer server at HOST:PORT'
+    )
+    parser.add_argument(
+        '--startup-time', action='store_true',
+        help='print the time from the start to the shown menu'
+    )
+    args = parser.parse_args()
+    if args.cell_size is not None and args.cell_size < 1:
+        parser.error('argument --cell-size: must be positive')
+    if args.replay_period is not None and args.replay_period < 1:
+        parser.error('argument --replay-period: must be positive')
+    if args.curses and args.connect:
+        parser.error('argument --connect: not allowed with --curses')
+    if args.level:
+        if args.connect or args.replay:
+            parser.error('argument --level: not allowed with '
+                         '--connect or --replay')
+        try:
+            args.level = Level.load(args.level)
+        except (OSError, LevelError) as error:
+            parser.error('argument --level: %s' % error)
+        if max(args.level.size) > GuiApp.MAX_GRID_SIZE:
+            parser.error('argument --level: columns and rows must be '
+                         'up to %d' % GuiApp.MAX_GRID_SIZE)
+        args.grid = args.level.size
+    args.replays = None
+    if args.replay:
+        try:
+            replays = Replay.read_all(args.replay)
+            first = next(replays, None)
+        except OSError as error:
+            parser.error('argument --replay: %s' % error)
+        if first is None:
+            parser.error('argument --replay: no games in %s' % args.replay)
+        if max(first.width, first.height) > GuiApp.MAX_GRID_SIZE:
+            parser.error('argument --replay: columns and rows must be '
+                         'up to %d' % GuiApp.MAX_GRID_SIZE)
+        args.grid = (first.width, first.height)
+        args.replays = itertools.chain((first,), replays)
+    if (args.cell_size is not None and not args.connect and
+            max(args.grid) * args.cell_size > GuiApp.MAX_AREA_SIZE):
+        parser.error('argument --cell-size: the game area must be up to '
+                     '%d pixels' % GuiApp.MAX_AREA_SIZE)
+    return args
+
+
 if __name__ == '__main__':
-    root = Tk()
-    gui = GuiApp(root)
-    game = Game(gui)
-    game.start()
-    root.mainloop()
+    stages = [('start', time.perf_counter())]
+    args = parse_args()
+    metrics = None
+    if args.metrics:
+        from metrics import Metrics
+        metrics = Metrics()
+        metrics.enable()
+    profile = None
+    if args.profile:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+    root = None
+    if args.curses:
+        from terminal import CursesApp
+        gui = CursesApp(args.grid)
+        stages.append(('CursesApp', time.perf_counter()))
+    else:
+        root = Tk()
+        stages.append(('Tk', time.perf_counter()))
+    if args.connect:
+        from client import NetworkGame
+        try:
+            game = NetworkGame(*args.connect)
+        except OSError as error:
+            sys.exit('Can not connect to the server: %s' % error)
+        try:
+            gui = GuiApp(
+                root, grid_size=game.grid_size, cell_size=args.cell_size,
+                bitmap=True
+            )
+        except ValueError as error:
+            sys.exit('Can not show the board of the server: %s' % error)
+        stages.append(('GuiApp', time.perf_counter()))
+        game.start(gui)
+    else:
+        if root is not None:
+            gui = GuiApp(
+                root, grid_size=args.grid, cell_size=args.cell_size,
+                bitmap=args.bitmap
+            )
+            stages.append(('GuiApp', time.perf_counter()))
+        game = Game(gui, args.level)
+        game.start(
+            tick_mode=args.tick_mode,
+            frame_stats=args.frame_stats,
+            autopilot=args.autopilot,
+            replays=args.replays,
+            replay_period=args.replay_period,
+            turbo=args.turbo
+        )
+    stages.append(('Game.start', time.perf_counter()))
+    if args.startup_time:
+        if root is not None:
+            root.update_idletasks()
+            stages.append(('menu shown', time.perf_counter()))
+        report_startup(stages)
+    gui.mainloop()
+    if profile is not None:
+        profile.disable()
+        profile.dump_stats(args.profile)
+    if metrics is not None:
+        metrics.dump(args.metrics)
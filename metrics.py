@@ -0,0 +1,165 @@
+"""Metrics class for PySnake game.
+
+This class measures the calls of the hot paths of the game: the number
+of calls, the cumulative time and the distribution of durations.
+Methods are wrapped only when the metrics are enabled, so the disabled
+metrics cost nothing. The results are exported as JSON or in the text
+format of Prometheus.
+
+"""
+
+
+import functools
+import json
+import time
+
+from engine import SnakeEngine
+from game import Game
+from gui import BitmapBoard, BitmapSnake, ItemPool, Snake, Segment
+from history import GameHistory
+from scheduler import Histogram
+from score_db import ScoreDb
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class Metric(object):
+    """Statistics of the calls of one function."""
+
+    BOUNDS = (
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+        1, 2.5, 5, 10, 25, 50, 100, 250, 1000
+    )
+
+    def __init__(self, name):
+        """Initialize an instance.
+
+        Argument name is the name of the function.
+
+        """
+        self.name = name
+        self.histogram = Histogram(Metric.BOUNDS)
+
+    def add(self, seconds):
+        """Adds a duration of a call."""
+
+        self.histogram.add(seconds * 1000)
+
+
+class Metrics(object):
+    """Collection of the metrics of the wrapped methods."""
+
+    HOT_PATHS = (
+        (SnakeEngine, 'step'),
+        (SnakeEngine, '_snake_crush'),
+        (SnakeEngine, '_create_apple'),
+        (Snake, 'sync'),
+        (BitmapSnake, 'sync'),
+        (BitmapBoard, 'flush'),
+        (ItemPool, 'acquire'),
+        (ItemPool, 'release'),
+        (Segment, '__init__'),
+        (Segment, 'release'),
+        (Game, '_tick'),
+        (Game, '_step'),
+        (ScoreDb, 'add_score'),
+        (ScoreDb, 'add_scores'),
+        (ScoreDb, 'queue_scores'),
+        (ScoreDb, 'get_scores'),
+        (ScoreDb, 'get_top_score'),
+        (ScoreDb, 'flush'),
+        (ScoreDb, '_commit'),
+        (GameHistory, 'append'),
+        (GameHistory, 'compact')
+    )
+
+    def __init__(self):
+        """Initialize an instance."""
+
+        self.metrics = {}
+        self._wrapped = []
+
+    def enable(self, targets=HOT_PATHS):
+        """Wraps the methods.
+
+        Argument targets is a sequence of pairs (class, method name).
+
+        """
+        for owner, attribute in targets:
+            self.wrap(owner, attribute)
+
+    def disable(self):
+        """Restores the wrapped methods."""
+
+        while self._wrapped:
+            owner, attribute, function = self._wrapped.pop()
+            setattr(owner, attribute, function)
+
+    def wrap(self, owner, attribute):
+        """Replaces the method of the class with a measured one."""
+
+        function = owner.__dict__[attribute]
+        static = isinstance(function, staticmethod)
+        target = function.__func__ if static else function
+        name = '%s.%s' % (owner.__name__, attribute)
+        metric = self.metrics.setdefault(name, Metric(name))
+        clock = time.perf_counter
+
+        @functools.wraps(target)
+        def measured(*args, **kwargs):
+            start = clock()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                metric.add(clock() - start)
+
+        if static:
+            measured = staticmethod(measured)
+        setattr(owner, attribute, measured)
+        self._wrapped.append((owner, attribute, function))
+
+    def as_dict(self):
+        """Returns the metrics as a dict of histograms (milliseconds)."""
+
+        return {
+            name: metric.histogram.as_dict()
+            for name, metric in sorted(self.metrics.items())
+        }
+
+    def as_prometheus(self):
+        """Returns the metrics in the text format of Prometheus."""
+
+        lines = [
+            '# HELP pysnake_call_seconds Duration of the calls.',
+            '# TYPE pysnake_call_seconds summary'
+        ]
+        for name, metric in sorted(self.metrics.items()):
+            histogram = metric.histogram
+            for quantile in (0.5, 0.9, 0.99):
+                lines.append(
+                    'pysnake_call_seconds{name="%s",quantile="%s"} %.9f' % (
+                        name, quantile,
+                        histogram.percentile(quantile * 100) / 1000
+                    )
+                )
+            lines.append('pysnake_call_seconds_sum{name="%s"} %.9f' % (
+                name, histogram.total / 1000
+            ))
+            lines.append('pysnake_call_seconds_count{name="%s"} %d' % (
+                name, histogram.count
+            ))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Writes the metrics to a file, in the text format
+        of Prometheus if the extension is .prom, otherwise as JSON.
+
+        """
+        with open(path, 'w') as metrics_file:
+            if path.endswith('.prom'):
+                metrics_file.write(self.as_prometheus())
+            else:
+                json.dump(self.as_dict(), metrics_file, indent=4)
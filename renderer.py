@@ -0,0 +1,137 @@
+"""Renderer class for PySnake game.
+
+This class describes the user interface used by the Game: the menu,
+the game area, the windows with the top of scores and the player name,
+the keys and the timers. The Game knows nothing about the widgets of
+the backends: GuiApp (tkinter) and CursesApp (terminal).
+
+"""
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class Renderer(object):
+    """Interface of the user interface backends.
+    The object of this class is controlled instance of the Game.
+
+    """
+
+    TITLE = 'PySnake'
+    GRID_SIZE = (25, 25)
+
+    def bind(self, start, scores, close):
+        """Sets the commands of the menu (start a game, show the top
+        of scores) and the command called when the user quits.
+
+        """
+        raise NotImplementedError
+
+    def bind_keys(self, callback):
+        """Calls callback(key) for the pressed arrow keys,
+        key is a key of SnakeEngine.DIRECTIONS.
+
+        """
+        raise NotImplementedError
+
+    def after(self, delay, callback, *args):
+        """Calls callback(*args) after delay milliseconds.
+        Returns an id for after_cancel().
+
+        """
+        raise NotImplementedError
+
+    def after_cancel(self, after_id):
+        """Cancels a call scheduled by after()."""
+
+        raise NotImplementedError
+
+    def show_menu(self):
+        """Shows main menu."""
+
+        raise NotImplementedError
+
+    def show_game(self):
+        """Shows game area."""
+
+        raise NotImplementedError
+
+    def show_status(self, score, top_score):
+        """Shows the score and the top score above the game area."""
+
+        raise NotImplementedError
+
+    def show_game_over(self, won=False):
+        """Shows the end of the game above the game area."""
+
+        raise NotImplementedError
+
+    def show_message(self, text):
+        """Shows the text above the game area."""
+
+        raise NotImplementedError
+
+    def create_snake(self, body):
+        """Returns the snake drawn on the game area."""
+
+        raise NotImplementedError
+
+    def create_apple(self, cell):
+        """Returns the apple drawn on the game area."""
+
+        raise NotImplementedError
+
+    def show_walls(self, cells):
+        """Draws the walls (a sequence of cells) into the background
+        of the game area once, the game does not redraw them.
+
+        """
+        raise NotImplementedError
+
+    def show_top_scores(self, scores, clear=None):
+        """Shows the top of scores: a list of pairs (player, score).
+        Argument clear is the command of the clear button, None
+        disables the button.
+
+        """
+        raise NotImplementedError
+
+    def close_top_scores(self):
+        """Closes the top of scores."""
+
+        raise NotImplementedError
+
+    def show_entry_player(self, score, ok, close):
+        """Shows score and entry for input a player name.
+        Argument ok is called when the name is entered,
+        close when the entry is closed without a name.
+
+        """
+        raise NotImplementedError
+
+    def get_player(self):
+        """Returns the entered player name."""
+
+        raise NotImplementedError
+
+    def close_entry_player(self):
+        """Closes the entry of the player name and clears it."""
+
+        raise NotImplementedError
+
+    def show_player_error(self):
+        """Shows a message with error."""
+
+        raise NotImplementedError
+
+    def mainloop(self):
+        """Runs the event loop until destroy()."""
+
+        raise NotImplementedError
+
+    def destroy(self):
+        """Closes the user interface."""
+
+        raise NotImplementedError
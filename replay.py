@@ -0,0 +1,187 @@
+"""Replay classes for PySnake game.
+
+A game is recorded as the size of the game area, the seed of the
+SnakeEngine and the turns of the snake keyed by tick, so it can be
+simulated again and the score checked without trusting the client.
+
+File format: the games follow each other, every game is a block of
+a header struct '<4sBHHQII' (MAGIC, VERSION, width, height, seed, size
+and CRC-32 of the records) and the records: unsigned LEB128 numbers
+ticks since the previous record << 3 | code, where code is the index
+of the direction in SnakeEngine.DIRECTIONS or END for the last record
+of the game. A turn takes one byte when it comes less than 16 ticks
+after the previous one. A game is kept in memory while it is played
+and appended as one block when it is closed, so games of several
+processes do not mix; a damaged block (a killed process, a bad disk)
+is skipped by the reader.
+
+"""
+
+
+import struct
+import zlib
+
+from engine import SnakeEngine
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+MAGIC = b'PSNR'
+VERSION = 2
+END = 4
+_HEADER = struct.Struct('<4sBHHQII')
+_DIRECTIONS = list(SnakeEngine.DIRECTIONS)
+_CODES = {
+    step: code for code, step in enumerate(SnakeEngine.DIRECTIONS.values())
+}
+
+
+class ReplayWriter(object):
+    """Appends a game to a replay file while it is played.
+    The object of this class is controlled instance of the Game.
+
+    """
+
+    def __init__(self, path, engine, seed):
+        """Initialize an instance.
+
+        Argument path is a path of the replay file, engine is
+        instance of the SnakeEngine in the initial state created
+        with the seed.
+
+        """
+        self._path = path
+        self._engine = engine
+        self._seed = seed
+        self._direction = engine.direction
+        self._tick = engine.ticks
+        self._records = bytearray()
+        self._closed = False
+
+    def record(self):
+        """Records the turn made at the last step, if any."""
+
+        engine = self._engine
+        if engine.direction != self._direction:
+            self._direction = engine.direction
+            self._write(_CODES[engine.direction])
+
+    def close(self):
+        """Records the end of the game and appends the game
+        to the file as one block.
+
+        """
+        if not self._closed:
+            self._closed = True
+            self._write(END)
+            engine = self._engine
+            block = _HEADER.pack(
+                MAGIC, VERSION, engine.width, engine.height, self._seed,
+                len(self._records), zlib.crc32(self._records)
+            ) + self._records
+            with open(self._path, 'ab') as replay_file:
+                replay_file.write(block)
+
+    def _write(self, code):
+        """Writes a record with the ticks since the previous one."""
+
+        value = (self._engine.ticks - self._tick) << 3 | code
+        self._tick = self._engine.ticks
+        while value > 0x7F:
+            self._records.append(value & 0x7F | 0x80)
+            value >>= 7
+        self._records.append(value)
+
+
+class Replay(object):
+    """Recorded game."""
+
+    def __init__(self, width, height, seed, turns, ticks):
+        """Initialize an instance.
+
+        Arguments width, height and seed are the arguments of the
+        SnakeEngine, turns is a dict of directions keyed by tick,
+        ticks is the number of ticks of the game.
+
+        """
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.turns = turns
+        self.ticks = ticks
+
+    def engine(self):
+        """Returns a SnakeEngine in the initial state of the game."""
+
+        return SnakeEngine(self.width, self.height, self.seed)
+
+    def simulate(self):
+        """Plays the game headless as fast as possible.
+        Returns the SnakeEngine in the final state.
+
+        """
+        engine = self.engine()
+        turns = self.turns
+        while not engine.done and engine.ticks < self.ticks:
+            engine.step(turns.get(engine.ticks + 1))
+        return engine
+
+    @staticmethod
+    def read_all(path):
+        """Yields the complete games of the replay file.
+        A damaged block is skipped: the reading goes on from the next
+        MAGIC after its start.
+
+        """
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+        position = data.find(MAGIC)
+        while position != -1:
+            replay, end = Replay._read_block(data, position)
+            if replay is None:
+                position = data.find(MAGIC, position + 1)
+            else:
+                yield replay
+                position = data.find(MAGIC, end)
+
+    @staticmethod
+    def _read_block(data, position):
+        """Returns the game of the block at the position and the end
+        of the block, (None, None) if the block is damaged.
+
+        """
+        if len(data) - position < _HEADER.size:
+            return None, None
+        magic, version, width, height, seed, size, crc = \
+            _HEADER.unpack_from(data, position)
+        start = position + _HEADER.size
+        records = data[start:start + size]
+        if (version != VERSION or len(records) != size or
+                zlib.crc32(records) != crc):
+            return None, None
+        turns = {}
+        tick = 0
+        position = 0
+        while position < size:
+            value = shift = 0
+            while True:
+                if position >= size:
+                    return None, None
+                byte = records[position]
+                position += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+            tick += value >> 3
+            if value & 7 == END:
+                if position != size:
+                    return None, None
+                return Replay(width, height, seed, turns, tick), start + size
+            if value & 7 > END:
+                return None, None
+            turns[tick] = _DIRECTIONS[value & 7]
+        return None, None
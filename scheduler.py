@@ -0,0 +1,177 @@
+"""TickScheduler class for PySnake game.
+
+This class runs the ticks of the game on the event loop of the Renderer
+(Tk or curses) at a fixed period measured from absolute deadlines, so
+the time spent in a tick does not stretch the period. Late ticks are
+caught up or skipped, the latency and jitter of every tick are recorded
+in histograms.
+
+"""
+
+
+import json
+import time
+
+from bisect import bisect_left
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class Histogram(object):
+    """Histogram of durations in milliseconds with fixed buckets."""
+
+    BOUNDS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+    def __init__(self, bounds=BOUNDS):
+        """Initialize an instance.
+
+        Argument bounds is a sorted sequence of the upper bounds
+        of the buckets, the last bucket has no bound.
+
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """Adds a duration in milliseconds."""
+
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket with the percentile."""
+
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        """Returns the histogram as a dict."""
+
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': dict(zip(
+                [str(bound) for bound in self.bounds] + ['inf'],
+                self.counts
+            ))
+        }
+
+
+class TickScheduler(object):
+    """Fixed timestep loop on top of the after() method of a Renderer.
+    The object of this class is controlled instance of the Game.
+
+    """
+
+    CATCH_UP = 'catch_up'
+    SKIP = 'skip'
+
+    def __init__(self, widget, tick, period, mode=SKIP, max_catch_up=5):
+        """Initialize an instance.
+
+        Argument widget is an object with the after() and after_cancel()
+        methods of Tk widgets, such as a Renderer, tick is called on every
+        tick and returns False to stop the loop, period returns the current
+        period in milliseconds. With mode CATCH_UP the missed ticks are
+        run at once (not more than max_catch_up), with mode SKIP they
+        are dropped and the next deadline is aligned to the period.
+
+        """
+        self._widget = widget
+        self._tick = tick
+        self._period = period
+        self.mode = mode
+        self.max_catch_up = max_catch_up
+        self.latency = Histogram()
+        self.jitter = Histogram()
+        self.skipped = 0
+        self._deadline = None
+        self._last_run = None
+        self._after_id = None
+
+    def start(self):
+        """Starts the loop, the first tick is made after one period."""
+
+        self.stop()
+        self._last_run = None
+        self._deadline = time.perf_counter() + self._get_period()
+        self._schedule()
+
+    def stop(self):
+        """Stops the loop."""
+
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def stats(self):
+        """Returns the collected statistics as a dict."""
+
+        return {
+            'mode': self.mode,
+            'skipped': self.skipped,
+            'latency_ms': self.latency.as_dict(),
+            'jitter_ms': self.jitter.as_dict()
+        }
+
+    def dump(self, path):
+        """Writes the collected statistics to a JSON file."""
+
+        with open(path, 'w') as stats_file:
+            json.dump(self.stats(), stats_file, indent=4)
+
+    def _get_period(self):
+        """Returns the current period in seconds."""
+
+        return max(self._period(), 1) / 1000
+
+    def _schedule(self):
+        """Schedules the next run at the deadline."""
+
+        delay = (self._deadline - time.perf_counter()) * 1000
+        self._after_id = self._widget.after(max(int(delay), 0), self._run)
+
+    def _run(self):
+        """Runs the tick(s) due and schedules the next run."""
+
+        self._after_id = None
+        now = time.perf_counter()
+        period = self._get_period()
+        self.latency.add((now - self._deadline) * 1000)
+        if self._last_run is not None:
+            self.jitter.add(abs(now - self._last_run - period) * 1000)
+        self._last_run = now
+        missed = int((now - self._deadline) / period)
+        ticks = 1
+        if missed:
+            if self.mode == TickScheduler.CATCH_UP:
+                ticks += min(missed, self.max_catch_up)
+                self.skipped += missed - (ticks - 1)
+            else:
+                self.skipped += missed
+            self._deadline += missed * period
+        for _ in range(ticks):
+            if not self._tick():
+                return
+        self._deadline += self._get_period()
+        self._schedule()
@@ -2,12 +2,25 @@
 
 This class describes the various operations with a local database
 that contains the results of the games.
+The results are kept in SQLite with an index on the score, so the top
+of the players and the max score do not depend on the database size.
+The results from the shelve database of the previous versions
+are moved to SQLite when the database is opened for the first time.
+Writes are made by a background thread in batches, so the game
+never waits for the disk; SQLite locks the file, so several processes
+may share one database. The error of a failed batch is raised
+by the next flush() or close().
 
 """
 
 
-from operator import itemgetter
-from shelve import DbfilenameShelf
+import dbm
+import queue
+import shelve
+import sqlite3
+import threading
+
+from collections.abc import MutableMapping
 
 
 __author__ = 'Artem Kustov'
@@ -15,48 +28,217 @@ __email__ = 'artem.kustov@artcom-net.ru'
 __version__ = '1.0'
 
 
-class ScoreDb(DbfilenameShelf):
+class ScoreDb(MutableMapping):
     """Used Game class to store results of the players."""
 
+    EXTENSION = '.sqlite3'
+    TIMEOUT = 30
+    _SCHEMA_VERSION = 1
+    _ADD_SCORE_SQL = (
+        'INSERT INTO scores (player, score) VALUES (?, ?) '
+        'ON CONFLICT (player) DO UPDATE '
+        'SET score = max(score, excluded.score)'
+    )
+
     def __init__(self, db_path):
         """Initialize an instance.
 
-        Argument db_path is an absolute path.
+        Argument db_path is an absolute path (without extension).
         The object of this class is controlled instance of the Game.
 
         """
-        super().__init__(db_path)
+        self._db_path = db_path
+        self._conn = self._connect()
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS scores ('
+                'player TEXT PRIMARY KEY, score INTEGER NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS scores_top '
+                'ON scores (score DESC, player ASC)'
+            )
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < ScoreDb._SCHEMA_VERSION:
+            self._migrate_shelve()
+        self.error = None
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name='ScoreDbWriter', daemon=True
+        )
+        self._writer.start()
+
+    def __getitem__(self, player):
+        self.flush()
+        row = self._conn.execute(
+            'SELECT score FROM scores WHERE player = ?', (player,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(player)
+        return row[0]
+
+    def __setitem__(self, player, score):
+        self._writes.put((
+            'INSERT OR REPLACE INTO scores (player, score) VALUES (?, ?)',
+            (player, score)
+        ))
+
+    def __delitem__(self, player):
+        self.flush()
+        with self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM scores WHERE player = ?', (player,)
+            )
+        if not cursor.rowcount:
+            raise KeyError(player)
+
+    def __iter__(self):
+        self.flush()
+        for row in self._conn.execute('SELECT player FROM scores'):
+            yield row[0]
+
+    def __len__(self):
+        self.flush()
+        return self._conn.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+
+    def __bool__(self):
+        self.flush()
+        return self._conn.execute(
+            'SELECT 1 FROM scores LIMIT 1'
+        ).fetchone() is not None
 
     def add_score(self, player, score):
         """Adds the result to the db."""
 
-        if player in self:
-            current_score = self[player]
-            self[player] = score if score > current_score else current_score
-        else:
-            self[player] = score
+        self._writes.put((ScoreDb._ADD_SCORE_SQL, (player, score)))
+
+    def add_scores(self, results):
+        """Adds the results (pairs of the player's name and score)
+        to the db in one transaction, returns when they are committed.
 
-    def get_scores(self):
-        """Returns a sorted list of tuples."""
+        """
+        self.flush()
+        with self._conn:
+            self._conn.executemany(ScoreDb._ADD_SCORE_SQL, results)
+
+    def queue_scores(self, results, done=None):
+        """Queues the results (pairs of the player's name and score)
+        like add_score(), they are added in one transaction.
+        Argument done is called by the writer thread after the commit.
 
-        return self._sort_scores()
+        """
+        self._writes.put((ScoreDb._ADD_SCORE_SQL, list(results), done))
 
-    def _sort_scores(self, count=10):
-        """Sorts a list of tuples of two values:
+    def get_scores(self, count=10):
+        """Returns a sorted list of tuples of two values:
         the player's name and number of score.
 
         """
-        return sorted(
-            sorted(self.items(), key=itemgetter(0), reverse=True),
-            key=itemgetter(1))[::-1][:count]
+        self.flush()
+        return self._conn.execute(
+            'SELECT player, score FROM scores '
+            'ORDER BY score DESC, player ASC LIMIT ?', (count,)
+        ).fetchall()
 
     def get_top_score(self):
         """Returns the max score in the database."""
 
-        return max(self.values()) if self.values() else 0
+        self.flush()
+        row = self._conn.execute('SELECT max(score) FROM scores').fetchone()
+        return row[0] or 0
 
     def clear_db(self):
         """Clear the db."""
 
-        for player in self:
-            del self[player]
+        self._writes.put(('DELETE FROM scores', ()))
+
+    def flush(self):
+        """Waits until the queued writes are committed.
+        Raises the error (sqlite3.Error or OSError of a callback)
+        of a batch of writes failed since the previous flush(),
+        the writes of the batch are lost.
+
+        """
+        self._writes.join()
+        self._raise_error()
+
+    def close(self):
+        """Commits the queued writes and closes the db.
+        Raises the error of a failed batch like flush().
+
+        """
+        self._writes.put(None)
+        self._writer.join()
+        self._conn.close()
+        self._raise_error()
+
+    def _raise_error(self):
+        """Raises the error of the writer thread once."""
+
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def _connect(self):
+        """Opens a connection to the db."""
+
+        return sqlite3.connect(
+            self._db_path + ScoreDb.EXTENSION, timeout=ScoreDb.TIMEOUT
+        )
+
+    def _write_loop(self):
+        """Commits the queued writes, all writes queued
+        by the time of a commit go to one transaction.
+        Runs in the writer thread until close().
+
+        """
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            running = None not in batch
+            try:
+                self._commit(conn, [write for write in batch if write])
+            except (sqlite3.Error, OSError) as error:
+                self.error = error
+            for _ in batch:
+                self._writes.task_done()
+        conn.close()
+
+    @staticmethod
+    def _commit(conn, writes):
+        """Makes the writes in one transaction, then calls
+        the callbacks of queue_scores().
+
+        """
+        callbacks = []
+        with conn:
+            for write in writes:
+                if len(write) == 3:
+                    sql, rows, done = write
+                    conn.executemany(sql, rows)
+                    if done is not None:
+                        callbacks.append(done)
+                else:
+                    conn.execute(*write)
+        for done in callbacks:
+            done()
+
+    def _migrate_shelve(self):
+        """Moves the results from the shelve database, if it exists."""
+
+        with self._conn:
+            if dbm.whichdb(self._db_path):
+                with shelve.open(self._db_path, 'r') as old_db:
+                    self._conn.executemany(
+                        ScoreDb._ADD_SCORE_SQL, old_db.items()
+                    )
+            self._conn.execute(
+                'PRAGMA user_version = %d' % ScoreDb._SCHEMA_VERSION
+            )
@@ -0,0 +1,406 @@
+"""Multiplayer server of PySnake game.
+
+The server hosts shared boards with many snakes and apples and is the
+only authority on their state. All boards are ticked from one asyncio
+loop, after every tick the clients of a board get the changed cells.
+The cells of a board are kept in a spatial hash (cell index -> owner),
+so a tick costs the same for any board size: every snake moves its
+head and tail and looks up one cell for a collision.
+
+Protocol: JSON documents, one per line, over TCP.
+From the server:
+    {"w": width, "h": height, "id": snake id, "c": cells, "s": scores}
+        the whole board, sent when a client joins;
+    {"t": tick, "c": cells, "s": scores, "d": [dead snake ids]}
+        the changes of a tick, scores only of the changed snakes;
+    cells is a flat list [index, owner, index, owner, ...], the owner
+    is APPLE, FREE or a snake id, index = y * width + x.
+From a client:
+    {"turn": key of SnakeEngine.DIRECTIONS} turns the snake;
+    {"spawn": true} puts a new snake after the death of the previous.
+
+"""
+
+
+import argparse
+import asyncio
+import json
+import random
+
+from collections import deque
+
+from engine import FreeCells, SnakeEngine, parse_size, queue_turn, take_turn
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+APPLE = 0
+FREE = -1
+
+
+class BoardSnake(object):
+    """Snake of a player on the Board."""
+
+    def __init__(self, snake_id, body, direction):
+        """Initialize an instance.
+
+        Argument snake_id is a positive number, body is a sequence
+        of cell indexes (the head is the first), direction is a value
+        of SnakeEngine.DIRECTIONS.
+
+        """
+        self.id = snake_id
+        self.body = deque(body)
+        self.direction = direction
+        self.score = 0
+        self.grow = 0
+        self.turns = deque()
+
+    def turn(self, direction):
+        """Queues a change of the direction, as SnakeEngine.turn()."""
+
+        queue_turn(self.turns, SnakeEngine.DIRECTIONS[direction])
+
+    def next_direction(self):
+        """Takes the first queued perpendicular turn, if any."""
+
+        self.direction = take_turn(self.turns, self.direction)
+        return self.direction
+
+
+class Board(object):
+    """Shared game area of many snakes with the rules of the SnakeEngine:
+    a snake dies when it leaves the area or its head gets into a snake
+    (heads meeting in one cell kill both snakes).
+
+    """
+
+    APPLES = 3
+    SPAWN_ATTEMPTS = 20
+
+    def __init__(self, width, height, apples=APPLES, seed=None):
+        """Initialize an instance.
+
+        Arguments width and height are the size of the game area
+        in cells, apples is the number of apples on the area,
+        seed is passed to the random generator.
+
+        """
+        self.width = width
+        self.height = height
+        self.random = random.Random(seed)
+        self.cells = {}
+        self.free = FreeCells(width * height)
+        self.snakes = {}
+        self.ticks = 0
+        self._changes = {}
+        self._scores = set()
+        self._last_id = 0
+        for _ in range(min(apples, width * height)):
+            self._create_apple()
+
+    def spawn(self):
+        """Puts a new snake on a free place of the area.
+        Returns the snake or None if there is no place.
+
+        """
+        length = SnakeEngine.SNAKE_LEN
+        for _ in range(Board.SPAWN_ATTEMPTS):
+            if not len(self.free):
+                break
+            head = self.free.sample(self.random)
+            x = head % self.width
+            if not length - 1 <= x < self.width - length:
+                continue
+            body = [head - offset for offset in range(length)]
+            if all(cell in self.free for cell in body):
+                self._last_id += 1
+                snake = BoardSnake(
+                    self._last_id, body, SnakeEngine.DIRECTIONS['Right']
+                )
+                self.snakes[snake.id] = snake
+                for cell in body:
+                    self._occupy(cell, snake.id)
+                self._scores.add(snake.id)
+                return snake
+        return None
+
+    def remove(self, snake_id):
+        """Removes the snake from the area."""
+
+        snake = self.snakes.pop(snake_id, None)
+        if snake is not None:
+            for cell in snake.body:
+                self._release(cell)
+
+    def full_state(self):
+        """Returns the whole board as a message."""
+
+        cells = []
+        for cell, owner in self.cells.items():
+            cells += (cell, owner)
+        return {
+            'w': self.width,
+            'h': self.height,
+            'c': cells,
+            's': {snake.id: snake.score for snake in self.snakes.values()}
+        }
+
+    def step(self):
+        """Advances all snakes by one tick.
+        Returns the changes as a message, or None if nothing changed.
+
+        """
+        self.ticks += 1
+        heads = {}
+        for snake in self.snakes.values():
+            step = snake.next_direction()
+            head = snake.body[0]
+            x = head % self.width + step[0]
+            y = head // self.width + step[1]
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                heads.setdefault(None, []).append(snake)
+                continue
+            heads.setdefault(y * self.width + x, []).append(snake)
+            if snake.grow:
+                snake.grow -= 1
+            else:
+                self._release(snake.body.pop())
+        dead = []
+        for head, movers in heads.items():
+            owner = self.cells.get(head, FREE)
+            if head is None or len(movers) > 1 or owner > APPLE:
+                dead += movers
+                continue
+            snake = movers[0]
+            snake.body.appendleft(head)
+            self._occupy(head, snake.id)
+            if owner == APPLE:
+                snake.score += 1
+                snake.grow += 1
+                self._scores.add(snake.id)
+                self._create_apple()
+        for snake in dead:
+            self.remove(snake.id)
+        return self._delta([snake.id for snake in dead])
+
+    def _delta(self, dead):
+        """Returns the changes collected since the previous call."""
+
+        if not self._changes and not self._scores and not dead:
+            return None
+        cells = []
+        for cell, owner in self._changes.items():
+            cells += (cell, owner)
+        message = {
+            't': self.ticks,
+            'c': cells,
+            's': {
+                snake_id: self.snakes[snake_id].score
+                for snake_id in self._scores if snake_id in self.snakes
+            },
+            'd': dead
+        }
+        self._changes.clear()
+        self._scores.clear()
+        return message
+
+    def _create_apple(self):
+        """Puts an apple on a free cell, if any."""
+
+        if len(self.free):
+            self._occupy(self.free.sample(self.random), APPLE)
+
+    def _occupy(self, cell, owner):
+        """Marks the cell as occupied by the owner."""
+
+        self.cells[cell] = owner
+        self.free.remove(cell)
+        self._changes[cell] = owner
+
+    def _release(self, cell):
+        """Marks the cell as free."""
+
+        del self.cells[cell]
+        self.free.add(cell)
+        self._changes[cell] = FREE
+
+
+class Server(object):
+    """Hosts the boards and ticks them from one asyncio loop."""
+
+    PERIOD = 100
+    SNAKES_PER_BOARD = 50
+    WRITE_BUFFER_LIMIT = 1 << 20
+
+    def __init__(self, boards, width, height, apples=Board.APPLES,
+                 period=PERIOD, snakes_per_board=SNAKES_PER_BOARD,
+                 seed=None):
+        """Initialize an instance.
+
+        Argument boards is the number of boards of width x height
+        cells with apples apples, period is the tick period in
+        milliseconds, a new client joins the board with the fewest
+        snakes while it has less than snakes_per_board snakes.
+
+        """
+        self.boards = [
+            Board(width, height, apples,
+                  None if seed is None else seed + number)
+            for number in range(boards)
+        ]
+        self.period = period
+        self.snakes_per_board = snakes_per_board
+        self._clients = {board: set() for board in self.boards}
+
+    async def serve(self, host, port):
+        """Accepts the clients and ticks the boards forever."""
+
+        server = await asyncio.start_server(self._handle, host, port)
+        async with server:
+            await self._run()
+
+    async def _run(self):
+        """Ticks all boards at the period from absolute deadlines."""
+
+        loop = asyncio.get_running_loop()
+        period = self.period / 1000
+        deadline = loop.time() + period
+        while True:
+            await asyncio.sleep(max(deadline - loop.time(), 0))
+            for board in self.boards:
+                self._tick(board)
+            deadline += period
+            if deadline < loop.time():
+                deadline = loop.time() + period
+
+    def _tick(self, board):
+        """Steps the board and sends the changes to its clients."""
+
+        message = board.step()
+        if message is None:
+            return
+        data = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+        for writer in list(self._clients[board]):
+            if writer.transport.get_write_buffer_size() > \
+                    Server.WRITE_BUFFER_LIMIT:
+                writer.close()
+            else:
+                writer.write(data)
+
+    def _choose_board(self):
+        """Returns the board with the fewest snakes or None."""
+
+        board = min(self.boards, key=lambda board: len(self._clients[board]))
+        if len(self._clients[board]) >= self.snakes_per_board:
+            return None
+        return board
+
+    async def _handle(self, reader, writer):
+        """Serves a client: joins it to a board and applies its turns."""
+
+        board = self._choose_board()
+        if board is None:
+            writer.close()
+            return
+        self._clients[board].add(writer)
+        snake = self._spawn(board, writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    command = json.loads(line)
+                except ValueError:
+                    break
+                if not isinstance(command, dict):
+                    break
+                alive = snake is not None and snake.id in board.snakes
+                turn = command.get('turn')
+                if alive and turn in SnakeEngine.DIRECTIONS:
+                    snake.turn(turn)
+                elif not alive and command.get('spawn'):
+                    snake = self._spawn(board, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients[board].discard(writer)
+            if snake is not None:
+                board.remove(snake.id)
+            writer.close()
+
+    @staticmethod
+    def _spawn(board, writer):
+        """Puts a snake of the client on the board and sends
+        the whole board. Returns the snake or None.
+
+        """
+        snake = board.spawn()
+        message = board.full_state()
+        message['id'] = snake.id if snake is not None else None
+        writer.write(
+            (json.dumps(message, separators=(',', ':')) + '\n').encode()
+        )
+        return snake
+
+
+def parse_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description='PySnake server')
+    parser.add_argument(
+        '--host', default='127.0.0.1',
+        help='address to listen on (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--port', type=int, default=8765,
+        help='port to listen on (default: 8765)'
+    )
+    parser.add_argument(
+        '--boards', type=int, default=1,
+        help='number of boards (default: 1)'
+    )
+    parser.add_argument(
+        '--grid', metavar='COLUMNSxROWS', default='50x50',
+        help='size of a board in cells (default: 50x50)'
+    )
+    parser.add_argument(
+        '--apples', type=int, default=Board.APPLES,
+        help='apples on a board (default: %d)' % Board.APPLES
+    )
+    parser.add_argument(
+        '--period', metavar='MS', type=int, default=Server.PERIOD,
+        help='tick period (default: %d)' % Server.PERIOD
+    )
+    parser.add_argument(
+        '--snakes', type=int, default=Server.SNAKES_PER_BOARD,
+        help='max snakes on a board (default: %d)' % Server.SNAKES_PER_BOARD
+    )
+    parser.add_argument(
+        '--seed', type=int,
+        help='seed of the boards'
+    )
+    args = parser.parse_args()
+    try:
+        args.grid = parse_size(args.grid)
+    except ValueError as error:
+        parser.error('argument --grid: %s' % error)
+    if min(args.boards, args.period, args.snakes) < 1:
+        parser.error('--boards, --period and --snakes must be positive')
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    server = Server(
+        args.boards, *args.grid, apples=args.apples, period=args.period,
+        snakes_per_board=args.snakes, seed=args.seed
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
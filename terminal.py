@@ -0,0 +1,392 @@
+"""CursesApp class for PySnake game.
+
+This class is the terminal backend of the Renderer: the game runs in
+a terminal (over SSH too) without an X display. The snake and the apple
+are the BitmapSnake and BitmapApple drawn on the TerminalBoard, which
+only collects the changed cells; every frame writes just those cells.
+Keys: arrows turn the snake, S or Enter starts a game, H shows the top
+of scores, Q quits.
+
+"""
+
+
+import curses
+import heapq
+import itertools
+import time
+
+from gui import Apple, BitmapApple, BitmapSnake, SnakeSegment
+from renderer import Renderer
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+class TerminalBoard(object):
+    """Game area of the terminal with the methods of the BitmapBoard.
+    The changed cells are drawn by the CursesApp.
+
+    """
+
+    def __init__(self, grid_size):
+        """Initialize an instance.
+
+        Argument grid_size is the number of columns and rows.
+
+        """
+        self.grid_size = grid_size
+        self.cells = {}
+        self.walls = ()
+        self.dirty = set()
+        self.cleared = True
+
+    def fill(self, cell, color=None):
+        """Paints the cell, by default with the background color."""
+
+        if 0 <= cell[0] < self.grid_size[0] and \
+                0 <= cell[1] < self.grid_size[1]:
+            if color:
+                self.cells[cell] = color
+            else:
+                self.cells.pop(cell, None)
+            self.dirty.add(cell)
+
+    def clear(self):
+        """Paints the whole game area with the background color."""
+
+        self.cells.clear()
+        self.dirty.clear()
+        self.cleared = True
+
+
+class CursesApp(Renderer):
+    """Terminal user interface of the game."""
+
+    KEYS = {
+        curses.KEY_LEFT: 'Left',
+        curses.KEY_RIGHT: 'Right',
+        curses.KEY_UP: 'Up',
+        curses.KEY_DOWN: 'Down'
+    }
+    _CELLS = {SnakeSegment.COLOR: ('[]', 1), Apple.COLOR: ('()', 2)}
+    _EMPTY = '  '
+    _WALL = '##'
+    _MAX_DELAY = 100
+    _ENTER = (10, 13, curses.KEY_ENTER)
+    _BACKSPACE = (8, 127, curses.KEY_BACKSPACE)
+    _ESCAPE = 27
+
+    def __init__(self, grid_size=Renderer.GRID_SIZE):
+        """Initialize an instance.
+
+        Argument grid_size is the number of columns and rows
+        of the game area.
+
+        """
+        self.grid_size = grid_size
+        self.board = TerminalBoard(grid_size)
+        self._screen = None
+        self._running = False
+        self._colors = False
+        self._view = None
+        self._dialog = None
+        self._redraw = True
+        self._status = ''
+        self._status_changed = True
+        self._message = ''
+        self._timers = []
+        self._cancelled = set()
+        self._ids = itertools.count(1)
+        self._commands = (None, None, None)
+        self._key_callback = None
+        self._scores = []
+        self._clear = None
+        self._entry_score = 0
+        self._entry_commands = (None, None)
+        self._player = ''
+
+    def bind(self, start, scores, close):
+        """Sets the commands of the menu keys and of the quit key."""
+
+        self._commands = (start, scores, close)
+
+    def bind_keys(self, callback):
+        """Calls callback(key) for the arrow keys pressed in the game."""
+
+        self._key_callback = callback
+
+    def after(self, delay, callback, *args):
+        """Calls callback(*args) after delay milliseconds."""
+
+        after_id = next(self._ids)
+        heapq.heappush(self._timers, (
+            time.monotonic() + delay / 1000, after_id, callback, args
+        ))
+        return after_id
+
+    def after_cancel(self, after_id):
+        """Cancels a call scheduled by after()."""
+
+        self._cancelled.add(after_id)
+
+    def show_menu(self):
+        """Shows main menu."""
+
+        self._view = 'menu'
+        self._redraw = True
+
+    def show_game(self):
+        """Shows game area."""
+
+        self._view = 'game'
+        self._redraw = True
+
+    def show_status(self, score, top_score):
+        """Shows the score and the top score above the game area."""
+
+        self._set_status('Score: %s    TopScore: %s' % (score, top_score))
+
+    def show_game_over(self, won=False):
+        """Shows the end of the game above the game area."""
+
+        self._set_status('You Win' if won else 'Game Over')
+
+    def show_message(self, text):
+        """Shows the text above the game area."""
+
+        self._set_status(text)
+
+    def create_snake(self, body):
+        """Returns the snake drawn on the game area."""
+
+        return BitmapSnake(self.board, body)
+
+    def create_apple(self, cell):
+        """Returns the apple drawn on the game area."""
+
+        return BitmapApple(self.board, cell)
+
+    def show_walls(self, cells):
+        """Draws the walls with the border of the game area,
+        only at the full redraw.
+
+        """
+        self.board.walls = tuple(cells)
+        self._redraw = True
+
+    def show_top_scores(self, scores, clear=None):
+        """Shows the top of scores, C clears it if clear is given."""
+
+        self._scores = scores
+        self._clear = clear
+        self._dialog = 'scores'
+        self._redraw = True
+
+    def close_top_scores(self):
+        """Closes the top of scores."""
+
+        self._dialog = None
+        self._redraw = True
+
+    def show_entry_player(self, score, ok, close):
+        """Shows score and entry for input a player name,
+        Enter calls ok, Escape calls close.
+
+        """
+        self._entry_score = score
+        self._entry_commands = (ok, close)
+        self._dialog = 'entry'
+        self._redraw = True
+
+    def get_player(self):
+        """Returns the entered player name."""
+
+        return self._player
+
+    def close_entry_player(self):
+        """Closes the entry of the player name and clears it."""
+
+        self._player = ''
+        self._dialog = None
+        self._redraw = True
+
+    def show_player_error(self):
+        """Shows a message with error until the next key."""
+
+        self._message = ('Player name must contain letter(s) '
+                         'and not exceed 15 characters!')
+        self._redraw = True
+
+    def mainloop(self):
+        """Runs the event loop in the terminal until destroy()."""
+
+        curses.wrapper(self._loop)
+
+    def destroy(self):
+        """Stops the event loop."""
+
+        self._running = False
+
+    def _set_status(self, text):
+        """Changes the text above the game area."""
+
+        self._status = text
+        self._status_changed = True
+
+    def _loop(self, screen):
+        """Runs the timers, draws the changes and reads the keys."""
+
+        self._screen = screen
+        screen.keypad(True)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        if curses.has_colors():
+            curses.use_default_colors()
+            curses.init_pair(1, curses.COLOR_GREEN, -1)
+            curses.init_pair(2, curses.COLOR_RED, -1)
+            self._colors = True
+        self._running = True
+        while self._running:
+            self._run_timers()
+            if not self._running:
+                break
+            self._draw()
+            delay = CursesApp._MAX_DELAY
+            if self._timers:
+                delay = min(delay, max(
+                    int((self._timers[0][0] - time.monotonic()) * 1000), 0
+                ))
+            screen.timeout(delay)
+            key = screen.getch()
+            if key == curses.KEY_RESIZE:
+                self._redraw = True
+            elif key != -1:
+                self._key_press(key)
+
+    def _run_timers(self):
+        """Calls the callbacks of after() that are due."""
+
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, after_id, callback, args = heapq.heappop(self._timers)
+            if after_id in self._cancelled:
+                self._cancelled.discard(after_id)
+            else:
+                callback(*args)
+
+    def _key_press(self, key):
+        """Handles the pressed key in the current view."""
+
+        if self._message:
+            self._message = ''
+            self._redraw = True
+        start, scores, close = self._commands
+        if self._dialog == 'entry':
+            ok, close_entry = self._entry_commands
+            if key in CursesApp._ENTER:
+                if self._player.strip():
+                    ok()
+            elif key == CursesApp._ESCAPE:
+                close_entry()
+            elif key in CursesApp._BACKSPACE:
+                self._player = self._player[:-1]
+                self._redraw = True
+            elif 32 <= key < 127:
+                self._player += chr(key)
+                self._redraw = True
+        elif self._dialog == 'scores':
+            if key in (ord('c'), ord('C')) and self._clear is not None:
+                self._clear()
+            else:
+                self.close_top_scores()
+        elif key in (ord('q'), ord('Q'), CursesApp._ESCAPE):
+            close()
+        elif self._view == 'menu':
+            if key in (ord('s'), ord('S')) + CursesApp._ENTER:
+                start()
+            elif key in (ord('h'), ord('H')):
+                scores()
+        elif key in CursesApp.KEYS and self._key_callback is not None:
+            self._key_callback(CursesApp.KEYS[key])
+
+    def _draw(self):
+        """Writes the changes to the screen."""
+
+        board = self.board
+        if self._redraw or board.cleared:
+            self._redraw = False
+            board.cleared = False
+            self._screen.erase()
+            if self._view == 'menu':
+                self._draw_lines([
+                    Renderer.TITLE, '',
+                    'S - START GAME', 'H - HIGH SCORE', 'Q - QUIT'
+                ])
+            elif self._view == 'game':
+                width, height = self.grid_size
+                edge = '+' + '-' * width * 2 + '+'
+                self._put(0, 0, edge)
+                self._put(height + 1, 0, edge)
+                for row in range(1, height + 1):
+                    self._put(row, 0, '|')
+                    self._put(row, width * 2 + 1, '|')
+                for x, y in board.walls:
+                    self._put(y + 1, x * 2 + 1, CursesApp._WALL)
+                for cell in board.cells:
+                    self._draw_cell(cell)
+                self._status_changed = True
+            if self._dialog == 'scores':
+                lines = ['%-16s %s' % ('Player', 'Score'), '']
+                lines += ['%-16s %s' % score for score in self._scores]
+                lines += ['', 'C - CLEAR' if self._clear else '',
+                          'any key - CLOSE']
+                self._draw_lines(lines)
+            elif self._dialog == 'entry':
+                self._draw_lines([
+                    'Score: %s' % self._entry_score, '',
+                    'Enter your name:', self._player + '_', '',
+                    'Enter - OK    Esc - CLOSE'
+                ])
+            if self._message:
+                self._put(self._screen.getmaxyx()[0] - 1, 0, self._message)
+            board.dirty.clear()
+        elif self._view == 'game' and self._dialog is None:
+            for cell in board.dirty:
+                self._draw_cell(cell)
+            board.dirty.clear()
+        if self._status_changed and self._view == 'game':
+            self._status_changed = False
+            self._put(0, 2, ' %-30s' % self._status)
+        self._screen.noutrefresh()
+        curses.doupdate()
+
+    def _draw_cell(self, cell):
+        """Writes a cell of the game area."""
+
+        text, pair = CursesApp._CELLS.get(
+            self.board.cells.get(cell), (CursesApp._EMPTY, 0)
+        )
+        attr = curses.A_BOLD
+        if self._colors and pair:
+            attr |= curses.color_pair(pair)
+        self._put(cell[1] + 1, cell[0] * 2 + 1, text, attr)
+
+    def _draw_lines(self, lines):
+        """Writes the lines in the center of the screen."""
+
+        rows, columns = self._screen.getmaxyx()
+        top = max((rows - len(lines)) // 2, 0)
+        for row, line in enumerate(lines, top):
+            self._put(row, max((columns - len(line)) // 2, 0), line)
+
+    def _put(self, row, column, text, attr=0):
+        """Writes the text, the part outside the screen is lost."""
+
+        try:
+            self._screen.addstr(row, column, text, attr)
+        except curses.error:
+            pass
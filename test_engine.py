@@ -0,0 +1,77 @@
+"""Tests of the SnakeEngine class for PySnake game.
+
+Run them with: python -m unittest test_engine
+
+"""
+
+
+import unittest
+
+from autopilot import Autopilot
+from engine import SnakeEngine
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+def state(engine):
+    """Returns everything a step changes, for comparison."""
+
+    return (
+        list(engine.body), bytes(engine.grid), list(engine.free._cells),
+        list(engine.free._positions), engine.random.getstate(),
+        engine.direction, engine.apple, engine.score, engine.speed,
+        engine.done
+    )
+
+
+def play(engine, ticks):
+    """Makes up to ticks steps by the Autopilot."""
+
+    autopilot = Autopilot(engine)
+    for _ in range(ticks):
+        if engine.done:
+            break
+        direction = autopilot.next_direction()
+        if direction is not None:
+            engine.turn(direction)
+        engine.step()
+
+
+class SnakeEngineTest(unittest.TestCase):
+    """Rewind buffer, snapshots and clones of the SnakeEngine."""
+
+    def test_rewind_round_trip(self):
+        engine = SnakeEngine(10, 10, seed=1, history=100)
+        before = state(engine)
+        play(engine, 60)
+        self.assertGreater(engine.score, 0)
+        self.assertEqual(engine.rewind(60), 60)
+        self.assertEqual(state(engine), before)
+
+    def test_restore_snapshot_before_rewind(self):
+        engine = SnakeEngine(10, 10, seed=1, history=100)
+        play(engine, 10)
+        snapshot = engine.snapshot()
+        engine.rewind(5)
+        play(engine, 5)
+        with self.assertRaises(ValueError):
+            engine.restore(snapshot)
+
+    def test_clone_is_independent(self):
+        engine = SnakeEngine(10, 10, seed=1, history=100)
+        play(engine, 10)
+        clone = engine.clone()
+        before = state(engine)
+        play(clone, 20)
+        clone.rewind(25)
+        self.assertEqual(state(engine), before)
+        self.assertNotEqual(state(clone), before)
+        play(engine, 20)
+        self.assertNotEqual(state(engine), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+"""Tournament runner of PySnake game.
+
+This module plays many headless games on all cores with a process
+pool and aggregates their scores. The games are played by the
+Autopilot, or the games of a replay file are simulated to verify
+their scores. Every game has its own seed derived from the base seed
+and the number of the game, so the results do not depend on the number
+of workers. The best score of every bot is written to the ScoreDb
+in one transaction.
+
+"""
+
+
+import argparse
+import itertools
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from autopilot import Autopilot
+from engine import SnakeEngine, parse_size
+from replay import Replay
+from score_db import ScoreDb
+
+
+__author__ = 'Artem Kustov'
+__email__ = 'artem.kustov@artcom-net.ru'
+__version__ = '1.0'
+
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def game_seed(seed, number):
+    """Returns the seed of the game number (SplitMix64)."""
+
+    value = (seed + (number + 1) * 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def play_game(width, height, seed, max_ticks):
+    """Plays a game by the Autopilot.
+    Returns the SnakeEngine in the final state.
+
+    """
+    engine = SnakeEngine(width, height, seed)
+    autopilot = Autopilot(engine)
+    while not engine.done and engine.ticks < max_ticks:
+        direction = autopilot.next_direction()
+        if direction is not None:
+            engine.turn(direction)
+        engine.step()
+    return engine
+
+
+def play_games(task):
+    """Plays the games of a task in a worker process.
+
+    Argument task is a tuple (first game number, number of games,
+    width, height, base seed, max ticks, number of bots).
+    Returns the Tally of the games.
+
+    """
+    first, count, width, height, seed, max_ticks, bots = task
+    tally = Tally()
+    for number in range(first, first + count):
+        engine = play_game(
+            width, height, game_seed(seed, number), max_ticks
+        )
+        tally.add(engine, 'Bot%03d' % (number % bots + 1))
+    return tally
+
+
+def verify_replays(replays):
+    """Simulates the replays in a worker process.
+    Returns the Tally of the games.
+
+    """
+    tally = Tally()
+    for replay in replays:
+        tally.add(replay.simulate())
+    return tally
+
+
+class Tally(object):
+    """Aggregated results of games."""
+
+    def __init__(self):
+        """Initialize an instance."""
+
+        self.games = 0
+        self.ticks = 0
+        self.wins = 0
+        self.total_score = 0
+        self.scores = {}
+        self.best = {}
+
+    def add(self, engine, player=None):
+        """Adds the result of the game of the finished SnakeEngine,
+        played by the player if it is given.
+
+        """
+        self.games += 1
+        self.ticks += engine.ticks
+        self.wins += engine.won
+        self.total_score += engine.score
+        self.scores[engine.score] = self.scores.get(engine.score, 0) + 1
+        if player is not None and engine.score > self.best.get(player, -1):
+            self.best[player] = engine.score
+
+    def merge(self, other):
+        """Adds the results of other Tally."""
+
+        self.games += other.games
+        self.ticks += other.ticks
+        self.wins += other.wins
+        self.total_score += other.total_score
+        for score, count in other.scores.items():
+            self.scores[score] = self.scores.get(score, 0) + count
+        for player, score in other.best.items():
+            if score > self.best.get(player, -1):
+                self.best[player] = score
+
+    def report(self, elapsed):
+        """Returns the text report of the games played in elapsed
+        seconds.
+
+        """
+        elapsed = max(elapsed, 1e-9)
+        lines = [
+            'games:        %d' % self.games,
+            'wins:         %d' % self.wins,
+            'mean score:   %.2f' % (
+                self.total_score / self.games if self.games else 0
+            ),
+            'max score:    %d' % max(self.scores, default=0),
+            'elapsed:      %.2f s' % elapsed,
+            'games/s:      %.1f' % (self.games / elapsed),
+            'ticks/s:      %.0f' % (self.ticks / elapsed)
+        ]
+        return '\n'.join(lines)
+
+
+class Tournament(object):
+    """Runs the games on a pool of worker processes."""
+
+    CHUNK_SIZE = 100
+
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE):
+        """Initialize an instance.
+
+        Argument workers is the number of processes (by default
+        the number of cores), chunk_size is the number of games
+        sent to a worker at once.
+
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def play(self, games, width, height, seed, max_ticks, bots):
+        """Plays the games by bots, returns the Tally."""
+
+        tasks = (
+            (first, min(self.chunk_size, games - first), width, height,
+             seed, max_ticks, bots)
+            for first in range(0, games, self.chunk_size)
+        )
+        return self._run(play_games, tasks)
+
+    def verify(self, replays):
+        """Simulates the replays, returns the Tally."""
+
+        replays = iter(replays)
+        tasks = iter(
+            lambda: list(itertools.islice(replays, self.chunk_size)), []
+        )
+        return self._run(verify_replays, tasks)
+
+    def _run(self, function, tasks):
+        """Runs the function on the tasks in the pool,
+        merges the results.
+
+        """
+        tally = Tally()
+        with ProcessPoolExecutor(self.workers) as executor:
+            for result in executor.map(function, tasks):
+                tally.merge(result)
+        return tally
+
+
+def parse_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description='PySnake tournament')
+    parser.add_argument(
+        '--games', type=int, default=1000,
+        help='number of games played by the bots (default: 1000)'
+    )
+    parser.add_argument(
+        '--bots', type=int, default=10,
+        help='number of bots, the games are dealt among them (default: 10)'
+    )
+    parser.add_argument(
+        '--grid', metavar='COLUMNSxROWS', default='25x25',
+        help='size of the game area in cells (default: 25x25)'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='base seed of the games (default: 0)'
+    )
+    parser.add_argument(
+        '--max-ticks', type=int, default=100000,
+        help='ticks after which a game is stopped (default: 100000)'
+    )
+    parser.add_argument(
+        '--replay', metavar='PATH',
+        help='verify the games of the replay file PATH instead of playing'
+    )
+    parser.add_argument(
+        '--workers', type=int,
+        help='number of worker processes (default: number of cores)'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=Tournament.CHUNK_SIZE,
+        help='games sent to a worker at once (default: %d)'
+        % Tournament.CHUNK_SIZE
+    )
+    parser.add_argument(
+        '--db', metavar='PATH',
+        help='write the best score of every bot to the score database '
+             'PATH (without extension)'
+    )
+    args = parser.parse_args()
+    try:
+        args.grid = parse_size(args.grid)
+    except ValueError as error:
+        parser.error('argument --grid: %s' % error)
+    if min(args.games, args.bots, args.chunk_size) < 1:
+        parser.error('--games, --bots and --chunk-size must be positive')
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    tournament = Tournament(args.workers, args.chunk_size)
+    start = time.perf_counter()
+    if args.replay:
+        tally = tournament.verify(Replay.read_all(args.replay))
+    else:
+        tally = tournament.play(
+            args.games, *args.grid, args.seed, args.max_ticks, args.bots
+        )
+    elapsed = time.perf_counter() - start
+    print(tally.report(elapsed))
+    print('workers:      %d' % tournament.workers)
+    if args.db and tally.best:
+        score_db = ScoreDb(args.db)
+        score_db.add_scores(sorted(tally.best.items()))
+        score_db.close()